@@ -0,0 +1,99 @@
+"""
+Download throughput benchmark against the local mock archive.
+
+Runs every combination of engine, concurrency, buffer size (and segment count) on a fresh destination
+folder and reports the aggregate metrics of each run:
+
+    python benchmarks/bench_download.py --files 20 --size 20M --bandwidth 10M --latency 0.05 \
+        --concurrent 1 4 8 --engine threads async --buffer-size 64K 1M --json results.jsonl
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from iadl.downloader import FileDownloader, human_readable_size, parse_size  # noqa: E402
+from iadl.metrics import DownloadMetrics  # noqa: E402
+from iadl.scraper import InternetArchiveScraper  # noqa: E402
+from mock_archive import MockArchive  # noqa: E402
+
+def run_scenario(base_url, item_id, engine, concurrent, segments, segment_threshold, buffer_size, verbose=False):
+    """Download the mock item once with the given settings and return the metrics summary"""
+    destination = tempfile.mkdtemp(prefix='iadl-bench-')
+    metrics = DownloadMetrics()
+    output = io.StringIO()
+    try:
+        # The downloader reports through print/tqdm; keep the benchmark table readable
+        with contextlib.redirect_stdout(sys.stdout if verbose else output), \
+                contextlib.redirect_stderr(sys.stderr if verbose else output):
+            files = InternetArchiveScraper(url=base_url, item_id=item_id).get_files()
+            if engine == 'async':
+                from iadl.async_downloader import AsyncFileDownloader
+                downloader = AsyncFileDownloader(destination, concurrent, delay=0, metrics=metrics,
+                                                 buffer_size=buffer_size)
+            else:
+                downloader = FileDownloader(destination, concurrent, segments=segments,
+                                            segment_threshold=segment_threshold, delay=0, metrics=metrics,
+                                            buffer_size=buffer_size)
+            downloader.download_files(files)
+        return metrics.summary()
+    finally:
+        shutil.rmtree(destination, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark iadl downloads against a local mock archive')
+    parser.add_argument('--files', type=int, default=10, help='Files in the mock item')
+    parser.add_argument('--size', type=parse_size, default='10M', help='Size of each file')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every request')
+    parser.add_argument('--bandwidth', type=parse_size, default=None, help='Bytes/sec per connection')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of downloads answered with 503')
+    parser.add_argument('--engine', nargs='+', choices=['threads', 'async'], default=['threads'])
+    parser.add_argument('--concurrent', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--segments', nargs='+', type=int, default=[1])
+    parser.add_argument('--segment-threshold', type=parse_size, default='1M')
+    parser.add_argument('--buffer-size', nargs='+', type=parse_size, default=[1024 * 1024])
+    parser.add_argument('--json', default=None, metavar='FILE', help='Append results as JSON lines to FILE')
+    parser.add_argument('--verbose', action='store_true', help='Show the downloader output')
+    args = parser.parse_args()
+    
+    archive = MockArchive(files=args.files, size=args.size, latency=args.latency,
+                          bandwidth=args.bandwidth, error_rate=args.error_rate)
+    base_url = archive.start()
+    item_id = next(iter(archive.items))
+    print(f"Mock archive: {args.files} files x {human_readable_size(args.size)}, latency {args.latency}s, "
+          f"bandwidth {human_readable_size(args.bandwidth) + '/s' if args.bandwidth else 'unlimited'}, "
+          f"error rate {args.error_rate:.0%}\n")
+    print(f"{'engine':<8} {'conc':>4} {'segs':>4} {'buffer':>8} {'time (s)':>9} {'throughput':>13} {'ttfb (ms)':>9} "
+          f"{'retries':>7} {'reuse':>6} {'failed':>6}")
+    
+    try:
+        for engine in args.engine:
+            for concurrent in args.concurrent:
+                for segments in (args.segments if engine == 'threads' else [1]):
+                    for buffer_size in args.buffer_size:
+                        summary = run_scenario(base_url, item_id, engine, concurrent, segments,
+                                               args.segment_threshold, buffer_size, args.verbose)
+                        reuse = summary['connection_reuse']
+                        ttfb = summary['ttfb_avg']
+                        print(f"{engine:<8} {concurrent:>4} {segments:>4} {human_readable_size(buffer_size):>8} "
+                              f"{summary['elapsed']:>9.2f} "
+                              f"{human_readable_size(summary['bytes_per_sec'] or 0) + '/s':>13} "
+                              f"{ttfb * 1000 if ttfb is not None else 0:>9.1f} {summary['retries']:>7} "
+                              f"{reuse if reuse is not None else 0:>6.0%} {summary['files_failed']:>6}")
+                        if args.json:
+                            with open(args.json, 'a') as f:
+                                f.write(json.dumps(dict(summary, engine=engine, concurrent=concurrent,
+                                                        segments=segments, buffer_size=buffer_size,
+                                                        files=args.files, size=args.size,
+                                                        latency=args.latency, bandwidth=args.bandwidth,
+                                                        error_rate=args.error_rate)) + '\n')
+    finally:
+        archive.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup time benchmark for the iadl command line.
+
+Runs each scenario in fresh interpreters and reports the time spent importing iadl
+(from `python -X importtime`), the wall time compared with an empty interpreter, and any
+heavy dependency that got loaded. Exits with status 1 when a scenario is over budget:
+
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 50
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules none of the scenarios below should need
+HEAVY_MODULES = ['requests', 'urllib3', 'bs4', 'tqdm', 'aiohttp', 'sqlite3', 'multiprocessing']
+
+SCENARIOS = {
+    'iadl --help': "import sys; sys.argv = ['iadl', '--help']\n"
+                   "from iadl.cli import main\n"
+                   "try:\n    main()\nexcept SystemExit:\n    pass\n",
+    'import iadl': "import iadl\n",
+    'iadl-cleanup': "import iadl.scripts.uninstall\n",
+}
+
+REPORT = ("import sys, json; print(json.dumps(sorted(m for m in %r if m in sys.modules)), file=sys.stderr)"
+          % HEAVY_MODULES)
+
+def run(code, importtime=False):
+    """Run code in a fresh interpreter; returns (wall seconds, stderr)"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, result.stderr
+
+def iadl_import_time(stderr):
+    """Sum the cumulative import time (seconds) of the top-level iadl modules in -X importtime output"""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; only count each top-level iadl import once
+        if name.startswith(' iadl') and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark iadl startup time')
+    parser.add_argument('--runs', type=int, default=10, help='Interpreters started per scenario')
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='Maximum iadl import time per scenario')
+    parser.add_argument('--json', default=None, metavar='FILE', help='Append results as JSON lines to FILE')
+    args = parser.parse_args()
+
+    baseline = statistics.median(run('pass')[0] for _ in range(args.runs))
+    print(f"Empty interpreter: {baseline * 1000:.1f} ms\n")
+    print(f"{'scenario':<14} {'import (ms)':>11} {'wall (ms)':>10} {'over empty':>11}  heavy modules")
+
+    failed = False
+    for name, code in SCENARIOS.items():
+        imports = []
+        walls = []
+        heavy = []
+        for _ in range(args.runs):
+            wall, _ = run(code)
+            walls.append(wall)
+            _, stderr = run(code + REPORT, importtime=True)
+            imports.append(iadl_import_time(stderr))
+            heavy = json.loads(stderr.strip().splitlines()[-1])
+        import_ms = statistics.median(imports) * 1000
+        wall_ms = statistics.median(walls) * 1000
+        print(f"{name:<14} {import_ms:>11.1f} {wall_ms:>10.1f} {wall_ms - baseline * 1000:>11.1f}  "
+              f"{', '.join(heavy) or '-'}")
+        if import_ms > args.budget_ms or heavy:
+            failed = True
+        if args.json:
+            with open(args.json, 'a') as f:
+                f.write(json.dumps({'scenario': name, 'import_ms': import_ms, 'wall_ms': wall_ms,
+                                    'baseline_ms': baseline * 1000, 'heavy_modules': heavy}) + '\n')
+
+    if failed:
+        print(f"\nFAILED: over the {args.budget_ms:.0f} ms import budget or loaded heavy modules")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Local HTTP server emulating the parts of archive.org used by iadl, for offline benchmarks.
+
+Serves /metadata/<item>, /details/<item>, /download/<item>/<file> (with HEAD, Range,
+ETag and Retry-After) and /services/search/v1/scrape for a collection of items, with
+configurable latency, per-connection bandwidth and error injection.
+
+    python benchmarks/mock_archive.py --files 20 --size 50M --latency 0.05 --bandwidth 20M
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from iadl.downloader import parse_size  # noqa: E402
+
+BLOCK_SIZE = 1024 * 1024
+COLLECTION = 'mock-collection'
+
+class MockArchive:
+    def __init__(self, items=1, files=10, size=10 * 1024 * 1024, latency=0.0, bandwidth=None,
+                 error_rate=0.0, seed=0, port=0):
+        """
+        Describe a mock archive of `items` items with `files` files of `size` bytes each.
+        Every request is delayed by `latency` seconds, each connection is limited to `bandwidth`
+        bytes/sec (unlimited if None) and a `error_rate` fraction of downloads get a 503.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.port = port
+        self.random = random.Random(seed)
+        self.block = self.random.randbytes(BLOCK_SIZE)
+        self.items = {}
+        for i in range(items):
+            item_id = f"mock-item-{i}"
+            self.items[item_id] = {f"file-{j}.bin": (j, size) for j in range(files)}
+        self.checksums = {}
+        self.server = None
+        self.thread = None
+    
+    def read(self, index, size, start, end):
+        """Bytes [start, end] of file number `index`: the random block, rotated by the file index"""
+        shift = (index * 4099) % BLOCK_SIZE
+        result = bytearray()
+        position = start
+        while position <= end:
+            offset = (position + shift) % BLOCK_SIZE
+            length = min(BLOCK_SIZE - offset, end + 1 - position)
+            result += self.block[offset:offset + length]
+            position += length
+        return bytes(result)
+    
+    def checksum(self, index, size):
+        """md5/sha1 of a file, computed once"""
+        key = (index, size)
+        if key not in self.checksums:
+            md5, sha1 = hashlib.md5(), hashlib.sha1()
+            for start in range(0, size, BLOCK_SIZE):
+                chunk = self.read(index, size, start, min(size, start + BLOCK_SIZE) - 1)
+                md5.update(chunk)
+                sha1.update(chunk)
+            self.checksums[key] = (md5.hexdigest(), sha1.hexdigest())
+        return self.checksums[key]
+    
+    def metadata(self, item_id):
+        files = []
+        for name, (index, size) in self.items.get(item_id, {}).items():
+            md5, sha1 = self.checksum(index, size)
+            files.append({'name': name, 'size': str(size), 'md5': md5, 'sha1': sha1,
+                          'mtime': '1700000000', 'format': 'Binary', 'source': 'original'})
+        return {'files': files} if files else {}
+    
+    def start(self):
+        """Start serving in a background thread. Returns the base URL."""
+        archive = self
+        
+        class Handler(MockArchiveHandler):
+            pass
+        Handler.archive = archive
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+class MockArchiveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    archive = None
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_HEAD(self):
+        self.handle_request(head=True)
+    
+    def do_GET(self):
+        self.handle_request()
+    
+    def handle_request(self, head=False):
+        archive = self.archive
+        if archive.latency:
+            time.sleep(archive.latency)
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        
+        if url.path.startswith('/services/search/v1/scrape'):
+            query = parse_qs(url.query)
+            count = int(query.get('count', ['100'])[0])
+            cursor = int(query.get('cursor', ['0'])[0])
+            ids = list(archive.items)[cursor:cursor + count]
+            page = {'items': [{'identifier': item_id} for item_id in ids], 'count': len(ids)}
+            if cursor + count < len(archive.items):
+                page['cursor'] = str(cursor + count)
+            return self.send_body(200, json.dumps(page).encode(), {'Content-Type': 'application/json'}, head)
+        
+        if len(parts) == 2 and parts[0] == 'metadata':
+            body = json.dumps(archive.metadata(parts[1])).encode()
+            return self.send_body(200, body, {'Content-Type': 'application/json'}, head)
+        
+        if len(parts) == 2 and parts[0] == 'details':
+            links = ''.join(f'<a href="/download/{parts[1]}/{name}">{name}</a>\n'
+                            for name in archive.items.get(parts[1], {}))
+            return self.send_body(200, f"<html><body>{links}</body></html>".encode(),
+                                  {'Content-Type': 'text/html'}, head)
+        
+        if len(parts) == 3 and parts[0] == 'download' and parts[2] in archive.items.get(parts[1], {}):
+            index, size = archive.items[parts[1]][parts[2]]
+            if archive.error_rate and archive.random.random() < archive.error_rate:
+                return self.send_body(503, b'Slow down', {'Retry-After': '1'}, head)
+            headers = {'ETag': f'"mock-{index}-{size}"', 'Accept-Ranges': 'bytes',
+                       'Content-Type': 'application/octet-stream'}
+            start, end, status = 0, size - 1, 200
+            match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+            if match and self.headers.get('If-Range', headers['ETag']) == headers['ETag']:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                if start >= size:
+                    headers['Content-Range'] = f"bytes */{size}"
+                    return self.send_body(416, b'', headers, head)
+                headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+                status = 206
+            return self.send_file(status, index, size, start, end, headers, head)
+        
+        self.send_body(404, b'Not found', {}, head)
+    
+    def send_body(self, status, body, headers, head=False):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def send_file(self, status, index, size, start, end, headers, head):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(end + 1 - start))
+        self.end_headers()
+        if head:
+            return
+        chunk_size = 64 * 1024
+        started = time.monotonic()
+        sent = 0
+        try:
+            for position in range(start, end + 1, chunk_size):
+                chunk = self.archive.read(index, size, position, min(end, position + chunk_size - 1))
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if self.archive.bandwidth:
+                    ahead = sent / self.archive.bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock archive.org server for iadl benchmarks')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--items', type=int, default=1, help='Number of items in the mock collection')
+    parser.add_argument('--files', type=int, default=10, help='Files per item')
+    parser.add_argument('--size', type=parse_size, default='10M', help='Size of each file')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--bandwidth', type=parse_size, default=None, help='Bytes/sec per connection')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of downloads answered with 503')
+    args = parser.parse_args()
+    
+    archive = MockArchive(items=args.items, files=args.files, size=args.size, latency=args.latency,
+                          bandwidth=args.bandwidth, error_rate=args.error_rate, port=args.port)
+    base_url = archive.start()
+    print(f"Mock archive serving at {base_url} (items: {', '.join(list(archive.items)[:3])}"
+          f"{', ...' if len(archive.items) > 3 else ''}; collection: {COLLECTION})")
+    try:
+        archive.thread.join()
+    except KeyboardInterrupt:
+        archive.stop()
+
+if __name__ == '__main__':
+    main()
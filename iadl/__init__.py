@@ -3,9 +3,31 @@ __version__ = "1.0.5"
 __author__ = "vichmartins"
 __description__ = "A Python package to scrape and download files from the Internet Archive."
 
-from iadl.scraper import InternetArchiveScraper
-from iadl.downloader import FileDownloader
-from iadl.cli import main
+# The public names are imported on first access: the scraper and downloader pull in
+# requests, bs4 and tqdm, which the CLI only needs on the paths that use them
+_LAZY_IMPORTS = {
+    "ArchiveFile": "iadl.files",
+    "InternetArchiveScraper": "iadl.scraper",
+    "FileDownloader": "iadl.downloader",
+    "DownloadResult": "iadl.progress",
+    "ProgressEvent": "iadl.progress",
+    "NullProgress": "iadl.progress",
+    "CallbackProgress": "iadl.progress",
+    "main": "iadl.cli",
+}
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'iadl' has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
 
 # Define __all__ to specify what gets imported with `from iad import *`
-__all__ = ["InternetArchiveScraper", "FileDownloader", "main"]
\ No newline at end of file
+__all__ = ["ArchiveFile", "InternetArchiveScraper", "FileDownloader", "DownloadResult", "ProgressEvent",
+           "NullProgress", "CallbackProgress", "main"]
@@ -0,0 +1,313 @@
+import time
+import asyncio
+from iadl.downloader import FileDownloader, human_readable_size
+from iadl.files import ArchiveFile
+from iadl.verify import expected_checksum
+from iadl.throttle import parse_retry_after
+from iadl.progress import CallbackProgress, DownloadResult, TqdmProgress
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for the asyncio engine
+    aiohttp = None
+
+class AsyncFileDownloader(FileDownloader):
+    def __init__(self, destination_folder, max_concurrent_downloads=50, item_subfolders=False, manifest=None,
+                 rate_limit=None, connection_rate_limit=None, adaptive=False, delay=1.0, metrics=None,
+                 buffer_size=1024 * 1024, preallocate=True, fsync=False, journal=None, work_queue=None,
+                 extract=False, discard_archive=False, extract_workers=4, progress=None):
+        """
+        Initialize an asyncio-based downloader that runs every transfer on one event loop.
+        All downloads share a single aiohttp client with a bounded pool of keep-alive connections,
+        so hundreds of files can be in flight without one thread per download.
+        Partial files, resume metadata and size checks are the same as FileDownloader's.
+        Archives are extracted after they are downloaded, in a worker thread.
+        Progress is shown as one bar for the whole batch unless another `progress` is given.
+        """
+        if aiohttp is None:
+            raise ImportError("The asyncio engine requires aiohttp: pip install aiohttp")
+        super().__init__(destination_folder, max_concurrent_downloads, item_subfolders=item_subfolders,
+                         manifest=manifest, rate_limit=rate_limit, connection_rate_limit=connection_rate_limit,
+                         adaptive=adaptive, delay=delay, metrics=metrics, buffer_size=buffer_size,
+                         preallocate=preallocate, fsync=fsync, journal=journal, work_queue=work_queue,
+                         extract=extract, discard_archive=discard_archive, extract_workers=extract_workers,
+                         progress=progress or TqdmProgress(aggregate=True))
+        self.connections_opened = 0
+        self.requests_sent = 0
+    
+    def error_status(self, error):
+        """Return (HTTP status, Retry-After seconds) carried by an aiohttp error, if any"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            headers = error.headers or {}
+            return error.status, parse_retry_after(headers.get('Retry-After'))
+        return None, None
+    
+    async def download_file_async(self, session, url, retries=3):
+        """Download a file from URL to the destination folder (asyncio version of download_file). Returns a DownloadResult."""
+        file = url if isinstance(url, ArchiveFile) else None
+        loop = asyncio.get_running_loop()
+        checksum = expected_checksum(url)
+        url, file_name, file_path = self.target_path(url)
+        part_path = file_path + self.PART_SUFFIX
+        key = self.manifest_key(file_path)
+        
+        # In sync mode an existing file is only downloaded again when it changed upstream.
+        # A skipped archive may still be extracted, so this runs off the event loop.
+        skipped = await loop.run_in_executor(None, self.skip_existing, file, file_name, file_path)
+        if skipped:
+            return skipped
+        
+        self.metrics.file_started(file_path, url)
+        started = time.monotonic()
+        transferred = 0
+        attempts = 0
+        success = False
+        error = None
+        for attempt in range(retries):
+            attempts += 1
+            if attempt:
+                self.metrics.retried(file_path)
+            try:
+                offset, state = self.resume_offset(url, part_path)
+                if offset:
+                    self.progress.message(f"Resuming download (attempt {attempt + 1}) at {human_readable_size(offset)}: {file_name}")
+                else:
+                    self.progress.message(f"Starting download (attempt {attempt + 1}): {file_name}")
+                if self.journal is not None:
+                    self.journal.start(key, offset)
+                
+                async with session.get(url, headers=self.resume_headers(offset, state)) as response:
+                    self.metrics.first_byte(file_path)
+                    if not (response.status == 416 and offset):
+                        response.raise_for_status()  # Raise exception for bad responses
+                    accepted = self.accept_response(url, file_name, part_path, offset, state,
+                                                    response.status, response.headers,
+                                                    preallocate=self.preallocate)
+                    if accepted is None:
+                        if await loop.run_in_executor(None, lambda: self.check_part(
+                                file_name, part_path, file_path, offset, checksum, downloaded=offset)):
+                            success = True
+                            break
+                        raise ValueError("partial file failed verification")
+                    mode, offset, total_size_in_bytes, state = accepted
+                    # Hashing a resumed prefix, preallocating and the final fsync can take long,
+                    # so they run in worker threads instead of stalling every other transfer
+                    hasher = await loop.run_in_executor(None, self.start_hash, checksum, part_path, offset)
+                    bucket = self.connection_bucket()
+                    self.progress.message(f"File size: {human_readable_size(total_size_in_bytes)}")
+                    self.progress.file_started(file_path, file_name, total_size_in_bytes, offset)
+                    
+                    # Writing one chunk is short compared to network reads, so writes stay on the loop;
+                    # progress and throttling are settled in batches rather than per chunk
+                    position = offset
+                    reported = offset
+                    unsaved = 0
+                    last_report = time.monotonic()
+                    try:
+                        f = await loop.run_in_executor(None, self.open_part, part_path, mode, offset,
+                                                       total_size_in_bytes, state)
+                        with f:
+                            async for chunk in response.content.iter_chunked(self.buffer_size):
+                                f.write(chunk)
+                                if hasher:
+                                    hasher.update(chunk)
+                                position += len(chunk)
+                                unsaved += len(chunk)
+                                if unsaved >= self.SEGMENT_CHECKPOINT:
+                                    self.checkpoint(key, part_path, state, position)
+                                    unsaved = 0
+                                now = time.monotonic()
+                                if now - last_report >= self.PROGRESS_INTERVAL:
+                                    self.progress.advance(file_path, position - reported)
+                                    self.metrics.add_bytes(file_path, position - reported)
+                                    pause = self.throttle_delay(position - reported, bucket)
+                                    reported = position
+                                    if pause:
+                                        await asyncio.sleep(pause)
+                                    last_report = time.monotonic()
+                    finally:
+                        self.progress.advance(file_path, position - reported)
+                        self.metrics.add_bytes(file_path, position - reported)
+                        self.progress.file_stopped(file_path)
+                        transferred += position - offset
+                        if unsaved:
+                            self.checkpoint(key, part_path, state, position)
+                
+                # Check if the download completed successfully
+                if await loop.run_in_executor(None, lambda: self.check_part(
+                        file_name, part_path, file_path, total_size_in_bytes, checksum, hasher, downloaded=position)):
+                    success = True
+                    break  # Exit the retry loop if successful
+                error = "incomplete or corrupt download"
+                if attempt == retries - 1:
+                    self.progress.message(f"Failed to download '{file_name}' after {retries} attempts.")
+                else:
+                    self.progress.message("Retrying...")
+                    await asyncio.sleep(self.retry_delay(attempt))  # Wait before retrying
+            
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                self.progress.message(f"Error downloading '{file_name}' (attempt {attempt + 1}): {str(e) or type(e).__name__}")
+                if attempt == retries - 1:
+                    self.progress.message(f"Failed to download '{file_name}' after {retries} attempts.")
+                else:
+                    self.progress.message("Retrying...")
+                    await asyncio.sleep(self.retry_delay(attempt, e))  # Wait before retrying
+        
+        if success and self.extract:
+            if not await loop.run_in_executor(None, self.extract_download, file_name, file_path):
+                success, error = False, "extraction failed"
+        result = self.download_result(url, file_path, success, started, transferred,
+                                      checksum, attempts, error)
+        self.finish_job(file, result)
+        
+        # Add a slight delay between downloads to be nice to the server
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return result
+    
+    def trace_config(self):
+        """aiohttp tracing hooks counting new connections and requests for the connection reuse metric"""
+        async def on_request_start(session, context, params):
+            self.requests_sent += 1
+            self.metrics.set_connections(self.connections_opened, self.requests_sent)
+        
+        async def on_connection_create_end(session, context, params):
+            self.connections_opened += 1
+            self.metrics.set_connections(self.connections_opened, self.requests_sent)
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+    
+    async def download_all(self, file_urls, total=None, results=None):
+        """
+        Download every file with at most max_concurrent_downloads transfers in flight.
+        Iterables without a length (streaming listings) are advanced in a worker thread,
+        so listing requests never block the event loop, and only as fast as slots free up.
+        DownloadResults are appended to `results` in completion order if it is given, so a caller
+        keeps the ones collected before an interruption; otherwise they are not kept.
+        """
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent_downloads)
+        timeout = aiohttp.ClientTimeout(sock_connect=30, sock_read=30)
+        semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
+        if total is None and hasattr(file_urls, '__len__'):
+            total = len(file_urls)
+        completed = 0
+        
+        async def worker(session, url):
+            key = None
+            try:
+                if self.work_queue is not None:
+                    # In sync mode a claim may hash the file on disk, which stays off the loop
+                    key = await asyncio.get_running_loop().run_in_executor(None, self.claim, url)
+                if self.work_queue is not None and key is None:
+                    result = DownloadResult(getattr(url, 'url', url), self.target_path(url)[2], 'skipped',
+                                            error="handled by another process")
+                elif self.concurrency is None:
+                    result = await self.download_file_async(session, url)
+                else:
+                    # The adaptive controller admits fewer transfers than the semaphore allows
+                    while not self.concurrency.try_acquire():
+                        await asyncio.sleep(0.1)
+                    try:
+                        result = await self.download_file_async(session, url)
+                    finally:
+                        self.concurrency.release()
+            except Exception as e:
+                # Like a failed future of the threaded engine: one broken file must not end the batch
+                error = str(e) or type(e).__name__
+                self.progress.message(f"Error downloading {getattr(url, 'url', url)}: {error}")
+                result = DownloadResult(getattr(url, 'url', url), self.target_path(url)[2], 'failed', error=error)
+            finally:
+                if key is not None:
+                    self.work_queue.release(key)
+                semaphore.release()
+            nonlocal completed
+            completed += 1
+            if results is not None:
+                results.append(result)
+            self.progress.message(f"\nFile {completed} of {total}" if total is not None
+                                  else f"\nFile {completed}")
+        
+        # Sizes of the listed files, for progress that covers the whole batch
+        total_bytes = sum(getattr(url, 'size', None) or 0 for url in file_urls) if total is not None else 0
+        self.progress.batch_started(total_bytes)
+        loop = asyncio.get_running_loop()
+        iterator = iter(file_urls)
+        tasks = set()
+        # auto_decompress is off so the bytes written match Content-Length and byte ranges
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, auto_decompress=False,
+                                         trace_configs=[self.trace_config()]) as session:
+            while True:
+                await semaphore.acquire()
+                if hasattr(file_urls, '__len__'):
+                    url = next(iterator, None)
+                else:
+                    url = await loop.run_in_executor(None, next, iterator, None)
+                if url is None:
+                    semaphore.release()
+                    break
+                task = asyncio.create_task(worker(session, url))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                self.metrics.set_queue_depth(len(tasks))
+            await asyncio.gather(*tasks)
+    
+    async def events(self, file_urls, schedule=None):
+        """
+        Download multiple files on the running event loop, yielding a ProgressEvent for every
+        report: 'message', 'started' and 'progress' while transfers run and 'finished' with
+        the file's DownloadResult. Progress passed to the constructor is not used meanwhile.
+
+            async for event in downloader.events(files):
+                if event.kind == 'finished':
+                    print(event.result)
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        previous = self.progress
+        self.progress = CallbackProgress(lambda event: loop.call_soon_threadsafe(queue.put_nowait, event))
+        task = None
+        try:
+            file_urls, total = self.prepare_batch(file_urls, schedule)
+            task = asyncio.create_task(self.download_all(file_urls, total))
+            # Reports from extraction threads arrive through call_soon_threadsafe, so the end of the
+            # batch is queued the same way to keep it behind them
+            task.add_done_callback(lambda _: loop.call_soon_threadsafe(queue.put_nowait, None))
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            await task  # Raises the batch's error, if any
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+            self.progress = previous
+            self.finish_batch()
+    
+    def download_files(self, file_urls, schedule=None, keep_results=True):
+        """
+        Download multiple files from the provided list of URLs or ArchiveFile records.
+        Any iterable works, e.g. a streaming collection listing, and is consumed lazily.
+        `schedule` orders and limits the files left after sync filtering (see prepare_batch).
+        Returns the list of DownloadResults in completion order; with keep_results=False it stays empty.
+        """
+        started = time.monotonic()
+        results = []
+        try:
+            file_urls, total = self.prepare_batch(file_urls, schedule)
+            asyncio.run(self.download_all(file_urls, total, results if keep_results else None))
+        except KeyboardInterrupt:
+            self.progress.message("\nDownload canceled by user. Exiting gracefully.")
+            return results
+        finally:
+            self.finish_batch()
+        self.progress.message(f"\nAll downloads completed in {time.monotonic() - started:.1f}s!")
+        return results
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+
+def default_cache_dir():
+    """
+    Return the folder used for cached item listings.
+    IADL_CACHE_DIR overrides it, otherwise the platform's user cache folder is used.
+    """
+    if os.environ.get('IADL_CACHE_DIR'):
+        return os.environ['IADL_CACHE_DIR']
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'iadl', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'iadl')
+
+class ListingCache:
+    def __init__(self, cache_dir=None, ttl=3600, max_bytes=64 * 1024 * 1024):
+        """
+        Initialize an on-disk cache of item listings, one JSON file per item.
+        Entries younger than `ttl` seconds are used without contacting the server; older ones
+        are revalidated with ETag/If-Modified-Since. The least recently used entries are
+        evicted once the cache grows beyond `max_bytes`.
+        """
+        self.cache_dir = os.path.abspath(cache_dir or default_cache_dir())
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+    
+    def entry_path(self, key):
+        """Path of the cache file for a key (e.g., 'https://archive.org/some-item')"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+    
+    def get(self, key):
+        """Return the cached entry for a key, or None. Reading an entry marks it as recently used."""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        try:
+            os.utime(path)  # The file's mtime is the LRU clock
+        except OSError:
+            pass
+        return entry
+    
+    def is_fresh(self, entry):
+        """True if the entry is younger than the TTL and can be used without revalidation"""
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+    
+    def put(self, key, data, etag=None, last_modified=None):
+        """Store the listing data for a key along with the validators from the response"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            'key': key,
+            'fetched_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data,
+        }
+        path = self.entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.evict()
+        return entry
+    
+    def touch(self, key, entry):
+        """Mark a revalidated entry (304 Not Modified) as freshly fetched"""
+        return self.put(key, entry['data'], etag=entry.get('etag'), last_modified=entry.get('last_modified'))
+    
+    def entries(self):
+        """List (mtime, size, path) for every cache file, least recently used first"""
+        result = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return result
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            result.append((stat.st_mtime, stat.st_size, path))
+        result.sort()
+        return result
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    
+    def clear(self):
+        """Remove every cached entry. Returns the number of entries removed."""
+        removed = 0
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -1,13 +1,19 @@
 import argparse
+import itertools
+import os
 import sys
 from urllib.parse import urlparse
-from iadl.scraper import InternetArchiveScraper
-from iadl.downloader import FileDownloader
+from iadl.units import parse_size
+from iadl.cache import ListingCache
+from iadl.manifest import SyncManifest
+from iadl.sharding import WorkQueue, parse_shard, shard_files
+from iadl.scheduler import ORDER_POLICIES, schedule_files
+from iadl.metrics import DownloadMetrics
 from iadl.extensions import (
     ARCHIVE_EXTENSIONS, VIDEO_EXTENSIONS, AUDIO_EXTENSIONS, STREAMING_EXTENSIONS,
     AUDIOBOOK_EXTENSIONS, DISK_IMAGE_EXTENSIONS, DOCUMENT_EXTENSIONS, EXECUTABLE_EXTENSIONS,
     DATA_EXTENSIONS, WEB_EXTENSIONS, COMIC_EXTENSIONS, EBOOK_EXTENSIONS, PICTURE_EXTENSIONS, 
-    CONTAINER_EXTENSIONS, TORRENT_EXTENSIONS, ALL_EXTENSIONS
+    CONTAINER_EXTENSIONS, TORRENT_EXTENSIONS, normalize_extensions
 )
 
 def extract_item_id(url):
@@ -18,6 +24,88 @@ def extract_item_id(url):
         return path.split('/')[1]
     return path
 
+def read_batch(source):
+    """
+    Read item URLs or IDs from a file ('-' for stdin), one per line.
+    Blank lines and lines starting with '#' are ignored; duplicates are dropped.
+    Returns None (after printing the error) if the file cannot be read.
+    """
+    try:
+        stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+        try:
+            # A dict keeps the first occurrence of every item in order
+            item_ids = {}
+            for line in stream:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    item_ids.setdefault(extract_item_id(line))
+            return list(item_ids)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    except OSError as e:
+        print(f"\nError: Could not read batch file '{source}': {e.strerror or e}")
+        return None
+
+def list_items(item_ids, file_extensions, cache, limit=0, workers=8):
+    """
+    List several items concurrently with a shared HTTP session.
+    Returns {item_id: [ArchiveFile, ...]} in the order of item_ids.
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+    from iadl.scraper import InternetArchiveScraper
+    session = requests.Session()
+
+    def list_item(item_id):
+        scraper = InternetArchiveScraper(url="https://archive.org", item_id=item_id, cache=cache, session=session)
+        files = scraper.get_files(file_extensions=file_extensions)
+        return files[:limit] if limit > 0 else files
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(item_ids)))) as executor:
+        return dict(zip(item_ids, executor.map(list_item, item_ids)))
+
+# File type filters shared by downloads and verify: (short option, long option, description)
+FILTER_OPTIONS = [
+    ('-z', '--archive', 'Archive formats (.zip, .rar, etc.)'),
+    ('-v', '--video', 'Video formats (.mp4, .avi, etc.)'),
+    ('-m', '--audio', 'Audio formats (.mp3, .flac, etc.)'),
+    ('-t', '--streaming', 'Streaming formats (.m3u8, .ts)'),
+    ('-b', '--audiobooks', 'Audiobook formats (.m4b, .aa)'),
+    ('-i', '--disk_images', 'Disk images (.iso, .dmg)'),
+    ('-o', '--documents', 'Documents (.pdf, .docx)'),
+    ('-x', '--executables', 'Executables (.exe, .msi)'),
+    ('-f', '--data', 'Data files (.csv, .json)'),
+    ('-w', '--web', 'Web files (.html, .css)'),
+    ('-k', '--comics', 'Comics (.cbr, .cbz)'),
+    ('-e', '--ebooks', 'eBooks (.epub, .mobi)'),
+    ('-p', '--pictures', 'Pictures (.jpg, .png)'),
+    ('-n', '--containers', 'Graphics containers (.psd, .xcf)'),
+    ('-r', '--torrent', 'Torrent files (.torrent)'),
+]
+
+def add_filter_arguments(parser, hidden=False):
+    """Add the file type filter flags to a parser"""
+    for short, long, description in FILTER_OPTIONS:
+        parser.add_argument(short, long, action='store_true', help=argparse.SUPPRESS if hidden else description)
+
+def recorded_files(folder):
+    """
+    Return the paths (relative to `folder`) of the files the sync manifest and job journal of a
+    destination folder know about, or None if it has neither.
+    """
+    from iadl.journal import JobJournal
+    recorded = None
+    if os.path.exists(os.path.join(folder, SyncManifest.FILE_NAME)):
+        recorded = set(SyncManifest(folder).entries)
+    if os.path.exists(os.path.join(folder, JobJournal.FILE_NAME)):
+        journal = JobJournal(folder)
+        try:
+            recorded = (recorded or set()) | journal.keys()
+        finally:
+            journal.close()
+    return recorded
+
 def get_file_extensions(args):
     """Get file extensions based on provided arguments."""
     file_extensions = []
@@ -58,10 +146,228 @@ def get_file_extensions(args):
                 args.comics, args.ebooks, args.pictures, args.containers, args.torrent]):
         return None
     
-    return file_extensions
+    return normalize_extensions(file_extensions)
+
+def create_downloader(args, item_subfolders=False):
+    """Create the downloader for the engine selected on the command line"""
+    manifest = SyncManifest(args.dest) if args.sync else None
+    journal = None
+    if args.journal:
+        from iadl.journal import JobJournal
+        journal = JobJournal(args.dest)
+    work_queue = WorkQueue(args.dest, ttl=args.lock_ttl) if args.work_queue else None
+    metrics = None
+    if args.metrics_json or args.metrics_prom:
+        metrics = DownloadMetrics(json_path=args.metrics_json, prometheus_path=args.metrics_prom)
+    throttling = {
+        'rate_limit': args.rate_limit,
+        'connection_rate_limit': args.connection_rate_limit,
+        'adaptive': args.adaptive,
+        'delay': args.delay,
+        'metrics': metrics,
+        'buffer_size': args.buffer_size,
+        'preallocate': not args.no_preallocate,
+        'fsync': args.fsync,
+        'journal': journal,
+        'work_queue': work_queue,
+        'extract': args.extract or args.discard_archive,
+        'discard_archive': args.discard_archive,
+    }
+    if args.engine == 'async':
+        from iadl.async_downloader import AsyncFileDownloader
+        return AsyncFileDownloader(args.dest, args.concurrent, item_subfolders=item_subfolders,
+                                   manifest=manifest, **throttling)
+    from iadl.downloader import FileDownloader
+    return FileDownloader(args.dest, args.concurrent, segments=args.segments,
+                          segment_threshold=args.segment_threshold, item_subfolders=item_subfolders,
+                          manifest=manifest, **throttling)
+
+def download(args, files, item_subfolders=False, limit=0):
+    """Create the downloader and download the files; sync mode drops the unchanged ones before they are ordered by policy"""
+    if args.shard:
+        files = shard_files(files, *args.shard)
+        print(f"Shard {args.shard[0]} of {args.shard[1]}: {len(files)} files")
+    downloader = create_downloader(args, item_subfolders=item_subfolders)
+    if limit > 0:
+        print(f"Limiting to {limit} files")
+    try:
+        # Files are ordered and budgeted once sync mode has dropped the unchanged ones
+        downloader.download_files(files, schedule=lambda pending: schedule_files(
+            pending, order=args.order, priorities=args.priority, max_bytes=args.max_bytes, limit=limit,
+            progress=downloader.progress))
+        if downloader.journal is not None:
+            report_failures(args, downloader.journal)
+    finally:
+        close_downloader(downloader)
+
+def close_downloader(downloader):
+    """Close the job journal and work queue created for a downloader (it leaves them open for reuse)"""
+    if downloader.journal is not None:
+        downloader.journal.close()
+    if downloader.work_queue is not None:
+        downloader.work_queue.close()
+
+def report_failures(args, journal):
+    """List the downloads the job journal records as failed and how to retry them"""
+    failures = journal.failures()
+    if failures:
+        print(f"\n{len(failures)} downloads failed:")
+        for key, reason in failures:
+            print(f"  {key}: {reason}")
+        print(f"Run 'iadl retry-failed -d {args.dest}' to try them again.")
+
+def run_journal(args, retry_failed=False):
+    """
+    Download the unfinished jobs recorded in the job journal of DEST without listing any item.
+    With retry_failed, the failed jobs are queued again first.
+    """
+    from iadl.journal import JobJournal, DONE, IN_PROGRESS, PENDING, FAILED
+    if not os.path.exists(os.path.join(args.dest, JobJournal.FILE_NAME)):
+        print(f"No job journal found in '{args.dest}' (downloads are recorded with --journal). Exiting.")
+        return
+    journal = JobJournal(args.dest)
+    try:
+        if retry_failed:
+            print(f"Queued {journal.retry_failed()} failed downloads again.")
+        counts = journal.counts()
+        print("Job journal: " + ", ".join(f"{counts.get(state, 0)} {state}"
+                                          for state in (DONE, IN_PROGRESS, PENDING, FAILED)))
+        jobs = journal.unfinished()
+    finally:
+        journal.close()
+    if not jobs:
+        print("Nothing left to download.")
+        return
+    
+    args.journal = True
+    # Jobs of batch and collection runs are saved in per-item subfolders
+    # File names can contain folders too, so compare each key with the item folder layout
+    from iadl.files import target_path
+    in_item_folder = {key for key, file in jobs
+                      if file.item_id and key == f"{file.item_id}/{target_path('', file)[1]}"}
+    for item_subfolders in (False, True):
+        files = [file for key, file in jobs if (key in in_item_folder) == item_subfolders]
+        if files:
+            download(args, files, item_subfolders=item_subfolders, limit=args.limit)
+
+def run_collection(args, scraper, file_extensions):
+    """
+    Stream the files of every item in a collection into the downloader while the collection is
+    still being enumerated. Ordering by size or a byte budget needs the whole listing, so in that
+    case the collection is listed completely first.
+    """
+    files = scraper.iter_collection_files(file_extensions)
+    
+    if args.show_links:
+        print("\n=== File Links ===")
+        for i, file in enumerate(itertools.islice(files, args.limit or None), 1):
+            print(f"{i:>5}. {file.url}")
+        print("==================\n")
+        print("Finished displaying links. No files were downloaded.")
+        return
+    
+    if args.order != 'listing' or args.priority or args.max_bytes is not None:
+        print("Ordering and byte budgets need the complete listing, enumerating the collection first...")
+        download(args, list(files), item_subfolders=True, limit=args.limit)
+        return
+    
+    if args.shard:
+        files = shard_files(files, *args.shard)
+    schedule = None
+    if args.limit > 0:
+        # Applied after sync mode has dropped the unchanged files, so a rerun picks up the next ones
+        schedule = lambda pending: itertools.islice(pending, args.limit)
+        print(f"Limiting to {args.limit} files")
+    downloader = create_downloader(args, item_subfolders=True)
+    try:
+        downloader.download_files(files, schedule=schedule, keep_results=False)
+        if downloader.journal is not None:
+            report_failures(args, downloader.journal)
+    finally:
+        close_downloader(downloader)
+
+def run_batch(args, file_extensions, cache):
+    """List every item of a batch file and download all their files through one downloader"""
+    item_ids = read_batch(args.batch)
+    if item_ids is None:
+        return
+    if not item_ids:
+        print("No items found in batch input. Exiting.")
+        return
+    print(f"Listing {len(item_ids)} items...")
+    
+    listings = list_items(item_ids, file_extensions, cache, limit=args.limit, workers=max(8, args.concurrent))
+    files = []
+    for item_id, item_files in listings.items():
+        print(f"{item_id}: {len(item_files)} files")
+        if args.show_links:
+            for i, file in enumerate(item_files, 1):
+                print(f"{i:>3}. {file.url}")
+        files.extend(item_files)
+    
+    if not files:
+        print("No files found. Exiting.")
+        return
+    if args.show_links:
+        print("\nFinished displaying links. No files were downloaded.")
+        return
+    
+    download(args, files, item_subfolders=True)
+
+def verify_main(argv):
+    """Re-check files already downloaded to a destination folder against the item's published checksums"""
+    parser = argparse.ArgumentParser(
+        prog='iadl verify',
+        description='Verify downloaded files against the MD5/SHA-1 checksums published by the Internet Archive'
+    )
+    parser.add_argument('-u', '--url', required=True, help='Internet Archive item URL (required)')
+    parser.add_argument('-d', '--dest', required=True, help='Folder the item was downloaded to (required)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of files hashed in parallel (default: number of CPU cores)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the item listing cache')
+    filters = parser.add_argument_group('file type filters (as used for the download)')
+    add_filter_arguments(filters)
+    args = parser.parse_args(argv)
+    
+    from iadl.scraper import InternetArchiveScraper
+    from iadl.verify import verify_folder
+    item_id = extract_item_id(args.url)
+    cache = None if args.no_cache else ListingCache()
+    scraper = InternetArchiveScraper(url="https://archive.org", item_id=item_id, cache=cache)
+    files = scraper.get_files(file_extensions=get_file_extensions(args))
+    if not files:
+        print("No files found. Exiting.")
+        sys.exit(1)
+    
+    dest = os.path.abspath(args.dest)
+    # Batch and collection runs save each item in a subfolder named after it
+    item_subfolders = os.path.isdir(os.path.join(dest, item_id))
+    if item_subfolders:
+        print(f"Looking for the files in {os.path.join(dest, item_id)}")
+    recorded = recorded_files(dest)
+    if recorded is not None:
+        print("Files missing from DEST are only reported if the sync manifest or job journal lists them.")
+    results = verify_folder(dest, files, workers=args.jobs, item_subfolders=item_subfolders, recorded=recorded)
+    failed = [name for name, status in results.items() if status != 'ok']
+    print(f"\n{len(results) - len(failed)} of {len(results)} files verified successfully.")
+    if failed:
+        sys.exit(1)
 
 def main():
     """Main function to parse arguments and run the scraper"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'verify':
+        try:
+            verify_main(sys.argv[2:])
+        except KeyboardInterrupt:
+            print("\nVerification canceled by user.")
+        return
+    
+    # 'resume' and 'retry-failed' take the same options as a download, without -u/--url
+    argv = sys.argv[1:]
+    command = None
+    if argv and argv[0] in ('resume', 'retry-failed'):
+        command, argv = argv[0], argv[1:]
+    
     try:
         parser = argparse.ArgumentParser(
             description='Internet Archive Manager (iadl)',
@@ -89,8 +395,86 @@ Usage Examples:
     iadl -u URL -s -m
     iadl --url URL --show-links --audio
 
+    # Re-check a finished download against the published checksums
+    iadl verify -u URL -d DEST
+
+    # Mirror every item listed in items.txt with 8 downloads at a time
+    iadl -a items.txt -d DEST -c 8
+    cat items.txt | iadl --batch - --dest DEST
+
 Concurrent Downloads:
   -c, --concurrent      Maximum number of concurrent downloads (default: 1)
+
+Scheduling (uses the file sizes from the item metadata):
+  --order POLICY          listing (default), largest (first, shortest total time) or smallest (first)
+  --priority PATTERN      Download files matching PATTERN first, e.g. '*.iso' (repeatable)
+  --max-bytes SZ          Only download files up to this total size, e.g. 50G
+
+Bandwidth and Politeness:
+  --rate-limit SZ         Total download rate limit per second, e.g. 20M (default: unlimited)
+  --connection-rate-limit SZ
+                          Rate limit per second for each connection (default: unlimited)
+  --adaptive              Treat -c as a maximum and adjust active downloads to the observed
+                          throughput, backing off on 429/503 responses and Retry-After
+  --delay SECONDS         Pause after each file (default: 1)
+
+Metrics:
+  --metrics-json FILE     Write per-file metrics (bytes/sec, time to first byte, retries) as JSON
+                          lines to FILE, followed by a summary line
+  --metrics-prom FILE     Keep aggregate metrics in FILE in the Prometheus textfile format
+
+Incremental Sync:
+  -y, --sync              Keep a manifest in DEST and only download files that are new or
+                          changed upstream since the last run (changed files are replaced)
+
+Job Journal (for long runs that may be interrupted):
+  -J, --journal           Record every queued file and its state (pending, in progress,
+                          done, failed and why) in a database in DEST
+  iadl resume -d DEST     Download the unfinished jobs of the journal without listing again
+  iadl retry-failed -d DEST
+                          Queue the failed jobs again and download them
+
+Sharding (several processes or hosts mirroring into one shared DEST):
+  --shard K/N             Only download shard K of N (1 <= K <= N). Files are assigned by a
+                          stable hash of their item and name, so N processes given the same
+                          listing split it without overlap
+  --work-queue            Claim every file with a lock file in DEST/.iadl-locks before
+                          downloading it; processes that share DEST skip claimed files
+  --lock-ttl SECONDS      Take over locks not refreshed for this long (default: 300)
+
+Download Engine:
+  --engine threads        One thread per concurrent download (default)
+  --engine async          asyncio with a pooled HTTP client, for hundreds of concurrent
+                          downloads (requires aiohttp; segmented downloads are not used)
+
+Segmented Downloads (split one large file into parallel byte ranges):
+  --segments N            Number of parallel segments per large file (default: 1 = off)
+  --segment-threshold SZ  Minimum file size to segment, e.g. 100M or 2G (default: 100M)
+
+Archive Extraction:
+  --extract               Extract .tar(.gz/.bz2/.xz) and .zip downloads into a folder named
+                          after the archive. Tar archives are extracted while they download,
+                          zip archives once complete (several members at a time)
+  --discard-archive       Delete each archive after it was extracted (implies --extract)
+
+Disk Writes:
+  --buffer-size SZ        Read buffer per download, e.g. 4M (default: 1M)
+  --no-preallocate        Do not reserve the full file size on disk before downloading
+  --fsync                 Flush each file to disk before moving it into place
+
+Collections:
+  -C, --collection        Treat the URL as a collection and download the files of all its items
+                          to DEST/<item_id>/, starting while the collection is still being listed
+
+Listing Cache (item listings are cached locally between runs):
+  --cache-ttl SECONDS     Use cached listings younger than this without asking the server (default: 3600)
+  --cache-dir DIR         Cache folder (default: ~/.cache/iadl, or IADL_CACHE_DIR)
+  --no-cache              Do not read or write the listing cache
+  --clear-cache           Remove all cached listings (can be used without -u/--url)
+
+Batch Mode (many items, one shared download pool):
+  -a, --batch FILE        Read item URLs or IDs from FILE, one per line ('-' for stdin).
+                          Items are listed concurrently and each is saved to DEST/<item_id>/
     
 Available File Type Filters (use -s/--show-links to preview):
   -z, --archive        Archive formats (.zip, .rar, etc.)
@@ -112,12 +496,16 @@ Available File Type Filters (use -s/--show-links to preview):
         )
 
         # Check if show-links is present in any form (-s or --show-links)
-        show_links_present = any(arg in sys.argv for arg in ['-s', '--show-links'])
+        show_links_present = any(arg in argv for arg in ['-s', '--show-links'])
+        clear_cache_present = '--clear-cache' in argv
+        batch_present = any(arg in argv for arg in ['-a', '--batch'])
         
         # Primary arguments
-        parser.add_argument('-u', '--url', required=True, 
-                          help='Internet Archive item URL (required)')
-        parser.add_argument('-d', '--dest', required=not show_links_present,
+        parser.add_argument('-u', '--url', required=not (clear_cache_present or batch_present or command), 
+                          help='Internet Archive item URL (required unless using -a/--batch)')
+        parser.add_argument('-a', '--batch', default=None,
+                          help="File with one item URL or ID per line ('-' for stdin)")
+        parser.add_argument('-d', '--dest', required=not (show_links_present or clear_cache_present),
                           help='Destination folder (required unless using -s/--show-links)')
         parser.add_argument('-l', '--limit', type=int, default=0,
                           help='Limit number of files to download (0=no limit)')
@@ -125,29 +513,76 @@ Available File Type Filters (use -s/--show-links to preview):
                           help='Display download links without downloading')
         parser.add_argument('-c', '--concurrent', type=int, default=1,
                           help='Maximum concurrent downloads (default: 1)')
+        parser.add_argument('--order', choices=ORDER_POLICIES, default='listing',
+                          help='Download order: listing, largest or smallest first (default: listing)')
+        parser.add_argument('--priority', action='append', default=[], metavar='PATTERN',
+                          help='File name pattern to download first (repeatable)')
+        parser.add_argument('--max-bytes', type=parse_size, default=None,
+                          help='Total size budget for the downloaded files (e.g. 50G)')
+        parser.add_argument('--rate-limit', type=parse_size, default=None,
+                          help='Total download rate limit in bytes/sec (e.g. 20M)')
+        parser.add_argument('--connection-rate-limit', type=parse_size, default=None,
+                          help='Per-connection download rate limit in bytes/sec')
+        parser.add_argument('--adaptive', action='store_true',
+                          help='Adapt the number of active downloads (up to -c) to throughput and throttling')
+        parser.add_argument('--delay', type=float, default=1.0,
+                          help='Seconds to pause after each file (default: 1)')
+        parser.add_argument('--metrics-json', default=None, metavar='FILE',
+                          help='Write download metrics as JSON lines to FILE')
+        parser.add_argument('--metrics-prom', default=None, metavar='FILE',
+                          help='Write aggregate download metrics as a Prometheus textfile')
+        parser.add_argument('-C', '--collection', action='store_true',
+                          help='Download every item of the collection at URL')
+        parser.add_argument('-y', '--sync', action='store_true',
+                          help='Only download new or changed files, tracked in a manifest in DEST')
+        parser.add_argument('-J', '--journal', action='store_true',
+                          help='Record the state of every download in a job journal in DEST')
+        parser.add_argument('--shard', type=parse_shard, default=None, metavar='K/N',
+                          help='Only download shard K of N of the listing (e.g. 3/8)')
+        parser.add_argument('--work-queue', action='store_true',
+                          help='Claim each file with a lock file in DEST, to share DEST between processes')
+        parser.add_argument('--lock-ttl', type=int, default=300,
+                          help='Seconds after which the lock of a dead process is taken over (default: 300)')
+        parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                          help='Download engine (default: threads)')
+        parser.add_argument('--segments', type=int, default=1,
+                          help='Parallel segments per large file (default: 1 = off)')
+        parser.add_argument('--segment-threshold', type=parse_size, default='100M',
+                          help='Minimum file size for segmented downloads (default: 100M)')
+        parser.add_argument('--buffer-size', type=parse_size, default='1M',
+                          help='Read buffer size per download (default: 1M)')
+        parser.add_argument('--no-preallocate', action='store_true',
+                          help='Do not preallocate files on disk')
+        parser.add_argument('--fsync', action='store_true',
+                          help='Flush each file to stable storage before moving it into place')
+        parser.add_argument('--extract', action='store_true',
+                          help='Extract downloaded tar and zip archives next to them')
+        parser.add_argument('--discard-archive', action='store_true',
+                          help='Delete each archive once extracted (implies --extract)')
+        parser.add_argument('--cache-ttl', type=int, default=3600,
+                          help='Seconds a cached item listing is used without revalidation (default: 3600)')
+        parser.add_argument('--cache-dir', default=None,
+                          help='Folder for cached item listings')
+        parser.add_argument('--no-cache', action='store_true',
+                          help='Bypass the item listing cache')
+        parser.add_argument('--clear-cache', action='store_true',
+                          help='Remove all cached item listings')
         
         # Category filters (hidden from main help but shown in epilog)
-        parser.add_argument('-z', '--archive', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-v', '--video', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-m', '--audio', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-t', '--streaming', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-b', '--audiobooks', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-i', '--disk_images', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-o', '--documents', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-x', '--executables', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-f', '--data', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-w', '--web', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-k', '--comics', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-e', '--ebooks', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-p', '--pictures', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-n', '--containers', action='store_true', help=argparse.SUPPRESS)
-        parser.add_argument('-r', '--torrent', action='store_true', help=argparse.SUPPRESS)
+        add_filter_arguments(parser, hidden=True)
         
-        args = parser.parse_args()
+        args = parser.parse_args(argv)
         
-        # Extract the item ID from the URL
-        item_id = extract_item_id(args.url)
-        print(f"Extracted item ID: {item_id}")
+        cache = None if args.no_cache else ListingCache(args.cache_dir, ttl=args.cache_ttl)
+        if args.clear_cache:
+            removed = ListingCache(args.cache_dir).clear()
+            print(f"Removed {removed} cached listings.")
+            if not (args.url or args.batch or command):
+                return
+        
+        if command:
+            run_journal(args, retry_failed=command == 'retry-failed')
+            return
         
         # Get the list of file extensions based on the provided arguments
         file_extensions = get_file_extensions(args)
@@ -156,21 +591,29 @@ Available File Type Filters (use -s/--show-links to preview):
         else:
             print("Showing all files (no filters applied).")
         
+        if args.batch:
+            run_batch(args, file_extensions, cache)
+            return
+        
+        # Extract the item ID from the URL
+        item_id = extract_item_id(args.url)
+        print(f"Extracted item ID: {item_id}")
+        
         # Create scraper object
-        scraper = InternetArchiveScraper(url="https://archive.org", item_id=item_id)
+        from iadl.scraper import InternetArchiveScraper
+        scraper = InternetArchiveScraper(url="https://archive.org", item_id=item_id, cache=cache)
         
-        # Get list of file URLs
-        file_urls = scraper.get_file_links(file_extensions=file_extensions, show_links=args.show_links)
+        if args.collection:
+            run_collection(args, scraper, file_extensions)
+            return
+        
+        # Get list of files (URL, size and checksums) from the item metadata
+        files = scraper.get_files(file_extensions=file_extensions, show_links=args.show_links)
         
-        if not file_urls:
+        if not files:
             print("No files found. Exiting.")
             return
         
-        # Apply limit if specified
-        if args.limit > 0:
-            file_urls = file_urls[:args.limit]
-            print(f"Limiting to {args.limit} files")
-        
         # If only showing links, exit here
         if args.show_links:
             print("\nFinished displaying links. No files were downloaded.")
@@ -181,9 +624,8 @@ Available File Type Filters (use -s/--show-links to preview):
             print("\nError: Destination folder is required for downloads.")
             return
         
-        # Create downloader object and download files
-        downloader = FileDownloader(args.dest, args.concurrent)
-        downloader.download_files(file_urls)
+        # Create downloader object, schedule and download files
+        download(args, files, limit=args.limit)
     
     except KeyboardInterrupt:
         print("\nExecution canceled by user. Exiting gracefully.")
\ No newline at end of file
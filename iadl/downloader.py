@@ -1,120 +1,994 @@
 import os
+import json
+import hashlib
 import requests
 import time
-from tqdm import tqdm
-from urllib.parse import unquote
-from concurrent.futures import ThreadPoolExecutor, as_completed, CancelledError
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, CancelledError, FIRST_COMPLETED
+from iadl.files import ArchiveFile, target_path
+from iadl.units import human_readable_size, parse_size  # noqa: F401 (re-exported)
+from iadl.verify import expected_checksum, hash_file
+from iadl.throttle import TokenBucket, AdaptiveConcurrency, backoff_delay, parse_retry_after
+from iadl.metrics import NullMetrics
+from iadl.progress import DownloadResult, TqdmProgress
+from iadl.extract import StreamingTarExtractor, archive_kind, extract_archive, extraction_folder
 
-def human_readable_size(size_in_bytes):
+def parse_content_range(value):
     """
-    Convert a file size in bytes to a human-readable format (e.g., B, KB, MB, GB, TB, PB, EB).
+    Parse a 'Content-Range: bytes start-end/total' header.
+    Returns (start, end, total); unknown parts ('*') are returned as None.
     """
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB', 'PB', 'EB']:
-        if size_in_bytes < 1024:
-            return f"{size_in_bytes:.2f} {unit}"
-        size_in_bytes /= 1024
-    return f"{size_in_bytes:.2f} EB"  # Exabytes (just in case!)
+    try:
+        unit, _, byte_range = value.strip().partition(' ')
+        if unit != 'bytes':
+            return None
+        span, _, total = byte_range.partition('/')
+        total = None if total == '*' else int(total)
+        if span == '*':
+            return None, None, total
+        start, _, end = span.partition('-')
+        return int(start), int(end), total
+    except (AttributeError, ValueError):
+        return None
 
 class FileDownloader:
-    def __init__(self, destination_folder, max_concurrent_downloads=1):
-        """Initialize the downloader with a destination folder and maximum concurrent downloads"""
+    # Suffixes for the in-progress file and its resume metadata
+    PART_SUFFIX = '.part'
+    STATE_SUFFIX = '.part.json'
+    # Bytes written by a segment (or a preallocated file) between two saves of its progress
+    SEGMENT_CHECKPOINT = 8 * 1024 * 1024
+    # Seconds between two progress bar updates
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, destination_folder, max_concurrent_downloads=1, segments=1,
+                 segment_threshold=100 * 1024 * 1024, item_subfolders=False, manifest=None,
+                 rate_limit=None, connection_rate_limit=None, adaptive=False, delay=1.0, metrics=None,
+                 buffer_size=1024 * 1024, preallocate=True, fsync=False, journal=None, work_queue=None,
+                 extract=False, discard_archive=False, extract_workers=4, progress=None):
+        """
+        Initialize the downloader with a destination folder and maximum concurrent downloads.
+        Files of at least segment_threshold bytes are fetched as `segments` parallel byte ranges
+        when the server supports it (segments=1 disables segmented downloads).
+        If item_subfolders is True, ArchiveFile records are saved under '<destination>/<item_id>/'.
+        With a SyncManifest, only new or changed files are downloaded and existing files
+        are replaced when their upstream version changes.
+        rate_limit and connection_rate_limit cap the total and per-connection throughput in bytes/sec.
+        With adaptive=True, max_concurrent_downloads becomes an upper bound and the number of active
+        transfers follows the observed throughput and throttling responses (429/503).
+        `delay` is the pause in seconds after each file, to be nice to the server.
+        `metrics` (a DownloadMetrics) collects per-file and aggregate transfer statistics.
+        Response bodies are read into a reused buffer of buffer_size bytes; with preallocate=True the
+        full size of a file is reserved on disk up front (posix_fallocate), and with fsync=True files
+        are flushed to stable storage before being moved into place.
+        With a JobJournal, the state of every queued file is recorded durably so an interrupted
+        run can be resumed without listing the items again.
+        With a WorkQueue, each file is claimed before it is downloaded, so several processes or
+        hosts can share one destination folder without downloading the same file twice.
+        With extract=True, tar and zip archives are unpacked next to the download (tar archives
+        while they stream in, when the download starts from the beginning); discard_archive=True
+        deletes each archive once it has been extracted.
+        Status messages and transfer progress go to `progress` (see iadl.progress); by default
+        they are printed with a tqdm bar per file.
+        """
         self.destination_folder = os.path.abspath(destination_folder)
         self.max_concurrent_downloads = max_concurrent_downloads
+        self.segments = max(1, segments)
+        self.segment_threshold = segment_threshold
+        self.item_subfolders = item_subfolders
+        self.manifest = manifest
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.connection_rate_limit = connection_rate_limit
+        self.concurrency = AdaptiveConcurrency(max_concurrent_downloads) if adaptive else None
+        self.delay = delay
+        self.metrics = metrics or NullMetrics()
+        self.progress = progress or TqdmProgress()
+        self.buffer_size = buffer_size
+        self.journal = journal
+        self.work_queue = work_queue
+        self.extract = extract
+        self.discard_archive = extract and discard_archive
+        self.extract_workers = extract_workers
+        self.preallocate = preallocate and hasattr(os, 'posix_fallocate')
+        self.fsync = fsync
+        
+        # One keep-alive connection pool shared by every download and segment
+        pool_size = max(10, max_concurrent_downloads * self.segments)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
         os.makedirs(self.destination_folder, exist_ok=True)
-        print(f"Destination folder: {self.destination_folder}\n")
+        self.progress.message(f"Destination folder: {self.destination_folder}\n")
+        if manifest is not None and manifest.unreadable:
+            self.progress.message(f"Warning: ignoring unreadable manifest {manifest.path}")
     
+    def update_connection_metrics(self):
+        """Report how many connections the shared session opened for how many requests"""
+        opened = requests_sent = 0
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    requests_sent += pool.num_requests
+        self.metrics.set_connections(opened, requests_sent)
+
+    def connection_bucket(self):
+        """Token bucket for one connection, or None without a per-connection rate limit"""
+        return TokenBucket(self.connection_rate_limit) if self.connection_rate_limit else None
+
+    def throttle_delay(self, amount, bucket=None):
+        """
+        Account `amount` transferred bytes against the rate limits and the adaptive controller.
+        Returns the number of seconds the transfer must pause before reading more.
+        """
+        delay = 0.0
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(amount)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve(amount))
+        if self.concurrency is not None:
+            self.concurrency.record_bytes(amount)
+        return delay
+
+    def error_status(self, error):
+        """Return (HTTP status, Retry-After seconds) carried by a download error, if any"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None, None
+        return response.status_code, parse_retry_after(response.headers.get('retry-after'))
+
+    def retry_delay(self, attempt, error=None):
+        """
+        Seconds to wait before the next attempt: exponential backoff with jitter, at least the
+        server's Retry-After. Throttling responses (429/503) also slow down the adaptive controller.
+        """
+        status, retry_after = self.error_status(error) if error is not None else (None, None)
+        if status in (429, 503):
+            self.progress.message(f"Server is throttling requests (HTTP {status}), backing off.")
+            if self.concurrency is not None:
+                self.concurrency.record_throttle(retry_after)
+        return max(backoff_delay(attempt), retry_after or 0)
+
+    def load_part_state(self, part_path):
+        """Load the resume metadata saved next to a partial file, or None if missing/corrupt"""
+        try:
+            with open(part_path[:-len(self.PART_SUFFIX)] + self.STATE_SUFFIX, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_part_state(self, part_path, state):
+        """Persist the resume metadata (URL, validators and expected size) for a partial file"""
+        state_path = part_path[:-len(self.PART_SUFFIX)] + self.STATE_SUFFIX
+        with open(state_path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(state_path + '.tmp', state_path)
+
+    def discard_part(self, part_path, keep_data=False):
+        """Remove a partial file and its resume metadata (only the metadata if keep_data is True)"""
+        paths = [part_path[:-len(self.PART_SUFFIX)] + self.STATE_SUFFIX]
+        if not keep_data:
+            paths.append(part_path)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def resume_offset(self, url, part_path):
+        """
+        Work out how many bytes of a partial file can be reused.
+        A partial file is only trusted when its metadata belongs to the same URL
+        and carries a validator (ETag or Last-Modified) to send with If-Range.
+        """
+        if not os.path.exists(part_path):
+            return 0, None
+
+        state = self.load_part_state(part_path)
+        if (not state or state.get('url') != url or 'segments' in state
+                or not (state.get('etag') or state.get('last_modified'))):
+            self.discard_part(part_path)
+            return 0, None
+
+        # A preallocated partial file is already full size; its progress is the last saved checkpoint
+        offset = min(os.path.getsize(part_path), state.get('written', float('inf')))
+        total = state.get('total') or 0
+        if total and offset > total:
+            self.discard_part(part_path)
+            return 0, None
+        return offset, state
+
+    def finalize_part(self, part_path, file_path):
+        """Atomically move a completed partial file into place and drop its metadata"""
+        if self.fsync:
+            with open(part_path, 'rb+') as f:
+                os.fsync(f.fileno())
+        os.replace(part_path, file_path)
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            # Make the rename itself durable
+            fd = os.open(os.path.dirname(file_path), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.discard_part(part_path)
+
+    def body_reader(self, response):
+        """
+        Return a readinto(buffer) callable for a streamed requests response.
+        The body is read into the caller's buffer through urllib3's readinto, which keeps its
+        content-length checks; older urllib3 versions without it fall back to read().
+        """
+        raw = response.raw
+        if hasattr(raw, 'readinto'):
+            return raw.readinto
+
+        def readinto(buffer):
+            data = raw.read(len(buffer))
+            buffer[:len(data)] = data
+            return len(data)
+        return readinto
+
+    def release_response(self, response):
+        """Hand a fully read response's connection back to the pool (read through body_reader)"""
+        release_conn = getattr(response.raw, 'release_conn', None)
+        if release_conn is not None:
+            release_conn()
+
+    def allocate(self, fd, offset, total):
+        """Reserve disk space for bytes offset..total of a file. Returns False if the filesystem refuses."""
+        try:
+            os.posix_fallocate(fd, offset, total - offset)
+            return True
+        except OSError:
+            return False
+
+    def open_part(self, part_path, mode, offset, total, state):
+        """
+        Open a partial file unbuffered, positioned at `offset` for the body that follows.
+        A preallocated file (state tracks 'written') is reserved up to `total`; otherwise
+        anything past `offset` is cut off.
+        """
+        f = open(part_path, 'r+b' if mode == 'ab' else 'wb', buffering=0)
+        f.seek(offset)
+        if state is not None and 'written' in state:
+            self.allocate(f.fileno(), offset, total)
+        else:
+            f.truncate(offset)
+        return f
+
+    def plan_segments(self, url, part_path, size=None):
+        """
+        Decide whether a file should be downloaded in parallel segments.
+        `size` is the size from the item listing, if known: smaller files are not probed.
+        Returns the probed file details, or None to use a single stream.
+        """
+        if self.segments < 2 or (size is not None and size < self.segment_threshold):
+            return None
+
+        # Keep finishing a partial file that was started as a single stream
+        state = self.load_part_state(part_path)
+        if os.path.exists(part_path) and state and 'segments' not in state:
+            return None
+
+        response = self.session.head(url, allow_redirects=True, timeout=30,
+                                 headers={'Accept-Encoding': 'identity'})
+        response.raise_for_status()
+        total = int(response.headers.get('content-length', 0))
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if (total < self.segment_threshold or response.headers.get('accept-ranges', '').lower() != 'bytes'
+                or not (etag or last_modified)):
+            return None
+
+        return {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'total': total,
+            # Fetch segments from the final location to skip the redirect on every range request
+            'location': response.url,
+        }
+
+    def split_segments(self, total):
+        """Split a file of `total` bytes into [start, end, next_offset] ranges, one per segment"""
+        count = min(self.segments, max(1, total // (1024 * 1024)))
+        size = total // count
+        segments = []
+        for i in range(count):
+            start = i * size
+            end = total - 1 if i == count - 1 else start + size - 1
+            segments.append([start, end, start])
+        return segments
+
+    def download_segmented(self, file_name, part_path, plan, attempt):
+        """
+        Download a file as several byte ranges fetched concurrently and written with
+        positional writes into a preallocated partial file. Progress of every segment
+        is checkpointed in the resume metadata so retries and restarts only fetch what is missing.
+        The bytes received are counted in plan['received'].
+        """
+        state = self.load_part_state(part_path)
+        if not (state and os.path.exists(part_path) and state.get('segments')
+                and all(state.get(key) == plan[key] for key in ('url', 'etag', 'last_modified', 'total'))):
+            if state or os.path.exists(part_path):
+                self.progress.message(f"Remote file changed or partial file unusable, restarting '{file_name}' from scratch.")
+            self.discard_part(part_path)
+            state = dict(plan, segments=self.split_segments(plan['total']))
+            # Every segment writes at its own offset, so the file is full size from the start:
+            # reserved on disk if possible, otherwise extended as a sparse file
+            with open(part_path, 'wb') as f:
+                if not (self.preallocate and self.allocate(f.fileno(), 0, plan['total'])):
+                    f.truncate(plan['total'])
+        state['location'] = plan['location']
+        self.save_part_state(part_path, state)
+
+        segments = state['segments']
+        pending = [segment for segment in segments if segment[2] <= segment[1]]
+        done = sum(segment[2] - segment[0] for segment in segments)
+        if done:
+            self.progress.message(f"Resuming download (attempt {attempt + 1}) at {human_readable_size(done)} "
+                  f"in {len(pending)} segments: {file_name}")
+        else:
+            self.progress.message(f"Starting download (attempt {attempt + 1}) in {len(pending)} segments: {file_name}")
+        self.progress.message(f"File size: {human_readable_size(plan['total'])}")
+
+        lock = threading.Lock()
+        validator = plan['etag'] or plan['last_modified']
+        metrics_key = part_path[:-len(self.PART_SUFFIX)]
+        journal_key = self.manifest_key(metrics_key)
+        self.progress.file_started(metrics_key, file_name, plan['total'], done)
+
+        fd = os.open(part_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+
+        def write_at(data, position):
+            # os.pwrite is not available on Windows, fall back to a locked seek + write
+            if hasattr(os, 'pwrite'):
+                return os.pwrite(fd, data, position)
+            with lock:
+                os.lseek(fd, position, os.SEEK_SET)
+                return os.write(fd, data)
+
+        def save_progress():
+            # Called with the lock held; the journal records the bytes of every segment on disk
+            self.save_part_state(part_path, state)
+            if self.journal is not None:
+                self.journal.progress(journal_key, sum(segment[2] - segment[0] for segment in segments))
+
+        def fetch_segment(segment):
+            bucket = self.connection_bucket()
+            headers = {
+                'Accept-Encoding': 'identity',
+                'Range': f"bytes={segment[2]}-{segment[1]}",
+                'If-Range': validator,
+            }
+            response = self.session.get(state['location'], stream=True, timeout=30, headers=headers)
+            self.metrics.first_byte(metrics_key)
+            with response:
+                response.raise_for_status()
+                content_range = parse_content_range(response.headers.get('content-range', ''))
+                if (response.status_code != 206 or content_range is None or content_range[0] != segment[2]
+                        or content_range[2] not in (None, plan['total'])):
+                    raise ValueError("server did not honour the segment range")
+                unsaved = 0
+                readinto = self.body_reader(response)
+                buffer = memoryview(bytearray(self.buffer_size))
+                while segment[2] <= segment[1]:
+                    received = readinto(buffer[:segment[1] + 1 - segment[2]])
+                    if not received:
+                        break
+                    view = buffer[:received]
+                    while view:
+                        written = write_at(view, segment[2])
+                        view = view[written:]
+                        segment[2] += written
+                    self.progress.advance(metrics_key, received)
+                    self.metrics.add_bytes(metrics_key, received)
+                    with lock:
+                        plan['received'] = plan.get('received', 0) + received
+                    pause = self.throttle_delay(received, bucket)
+                    if pause:
+                        time.sleep(pause)
+                    unsaved += received
+                    if unsaved >= self.SEGMENT_CHECKPOINT:
+                        with lock:
+                            save_progress()
+                        unsaved = 0
+                if segment[2] > segment[1]:
+                    self.release_response(response)
+            if segment[2] <= segment[1]:
+                raise ValueError("segment ended before all of its bytes were received")
+
+        errors = []
+        try:
+            with ThreadPoolExecutor(max_workers=len(pending) or 1) as executor:
+                futures = [executor.submit(fetch_segment, segment) for segment in pending]
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(e)
+        finally:
+            os.close(fd)
+            self.progress.file_stopped(metrics_key)
+            with lock:
+                save_progress()
+
+        if errors:
+            raise errors[0]
+
+    def target_path(self, url):
+        """
+        Resolve where a download is saved (see iadl.files.target_path) and create its folder.
+        `url` may be a URL string or an ArchiveFile record; returns (url, file_name, file_path).
+        """
+        url, file_name, file_path = target_path(self.destination_folder, url, self.item_subfolders)
+        folder = os.path.dirname(file_path)
+        if folder != self.destination_folder:
+            os.makedirs(folder, exist_ok=True)
+        return url, file_name, file_path
+
+    def manifest_key(self, file_path):
+        """Key of a downloaded file in the sync manifest: its path relative to the destination folder"""
+        return os.path.relpath(file_path, self.destination_folder).replace(os.sep, '/')
+
+    def queue_jobs(self, file_urls):
+        """
+        Record the files about to be downloaded in the job journal.
+        Lists are added in one transaction; other iterables are recorded as they are consumed.
+        """
+        def jobs(files):
+            for file in files:
+                yield self.manifest_key(self.target_path(file)[2]), file
+        if hasattr(file_urls, '__len__'):
+            self.journal.add(jobs(file_urls))
+            return file_urls
+        return self.journal.track(jobs(file_urls))
+
+    def is_downloaded(self, file_path):
+        """True if a file is in place, or was extracted and the archive discarded"""
+        if os.path.exists(file_path):
+            return True
+        return (self.discard_archive and archive_kind(file_path) is not None
+                and os.path.isdir(extraction_folder(file_path)))
+
+    def skip_existing(self, file, file_name, file_path):
+        """
+        Skip a file that was already downloaded, unless sync mode is checking it against its
+        upstream version. Archives downloaded without extraction are extracted now if asked.
+        Returns the DownloadResult of a skipped file, or None.
+        """
+        if not self.is_downloaded(file_path) or (self.manifest is not None and file is not None):
+            return None
+        self.progress.message(f"File '{file_name}' already exists. Skipping.")
+        if (self.extract and archive_kind(file_name) is not None and os.path.exists(file_path)
+                and not os.path.isdir(extraction_folder(file_path))):
+            self.extract_download(file_name, file_path)
+        url = file.url if file is not None else None
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+        result = DownloadResult(url, file_path, 'skipped', size=size)
+        self.finish_job(None, result)
+        return result
+
+    def start_extraction(self, file_name, file_path, offset):
+        """Start extracting a tar archive while it streams in; only possible when it is downloaded from the start"""
+        if not self.extract or offset or archive_kind(file_name) != 'tar':
+            return None
+        return StreamingTarExtractor(file_path)
+
+    def extract_download(self, file_name, file_path, extractor=None):
+        """
+        Extract a downloaded archive, or move its streamed extraction into place.
+        If streaming failed, the archive is extracted from disk instead. Errors are reported
+        and leave the archive in place. Returns True on success (or for non-archives).
+        """
+        if archive_kind(file_name) is None:
+            return True
+        try:
+            if extractor is not None and extractor.finish():
+                folder = extractor.commit()
+            else:
+                if extractor is not None:
+                    self.progress.message(f"Extracting '{file_name}' while downloading failed ({extractor.error}), "
+                          f"extracting it from disk")
+                    extractor.abort()
+                folder = extract_archive(file_path, self.extract_workers)
+        except Exception as e:
+            self.progress.message(f"ERROR: Could not extract '{file_name}': {str(e)}")
+            return False
+        self.progress.message(f"Extracted '{file_name}' to '{folder}'")
+        if self.discard_archive:
+            os.remove(file_path)
+        return True
+
+    def matches_local(self, file, file_path):
+        """True if a file already on disk has the listed size and checksum (used to adopt files into a new manifest)"""
+        if file.size is None:
+            return False
+        try:
+            if os.path.getsize(file_path) != file.size:
+                return False
+        except OSError:
+            return False
+        checksum = expected_checksum(file)
+        return checksum is None or hash_file(file_path, checksum[0]).hexdigest() == checksum[1]
+
+    def is_pending(self, file):
+        """
+        True if a file is new or changed upstream since the last sync.
+        Files recorded in the manifest with the same size, mtime and checksums are skipped
+        without touching the disk; files that predate the manifest are adopted if they match.
+        """
+        if not isinstance(file, ArchiveFile):
+            return True
+        _, _, file_path = self.target_path(file)
+        key = self.manifest_key(file_path)
+        if self.manifest.is_current(key, file):
+            return False
+        if self.matches_local(file, file_path):
+            self.manifest.record(key, file)
+            return False
+        return True
+
+    def sync_filter(self, files):
+        """Keep only the files that are new or changed upstream since the last sync"""
+        pending = [file for file in files if self.is_pending(file)]
+        self.progress.message(f"Sync: {len(files) - len(pending)} files unchanged, {len(pending)} new or changed.")
+        return pending
+
+    def resume_headers(self, offset, state):
+        """Request headers for a download starting at `offset` bytes of the partial file"""
+        # Ask for the raw bytes so Content-Length and ranges match what is written to disk
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = state.get('etag') or state.get('last_modified')
+        return headers
+
+    def accept_response(self, url, file_name, part_path, offset, state, status_code, headers, preallocate=False):
+        """
+        Check a download response against the partial file it continues and record its validators.
+        Returns (mode, offset, total, state) for writing the body, or None when the partial file
+        already holds the whole file (416 on a resume). Raises ValueError after discarding
+        the partial file when the server's answer does not line up with it.
+        With preallocate=True, the saved state tracks the bytes written ('written') so the
+        partial file can be reserved at full size; state is None when the download cannot resume.
+        """
+        # The partial file already holds every byte the server has
+        if status_code == 416 and offset:
+            content_range = parse_content_range(headers.get('content-range', ''))
+            if content_range and content_range[2] == offset == state.get('total'):
+                return None
+            self.discard_part(part_path)
+            raise ValueError("server rejected the resume range, restarting from scratch")
+
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+
+        if status_code == 206 and offset:
+            content_range = parse_content_range(headers.get('content-range', ''))
+            if content_range is None or content_range[0] != offset:
+                self.discard_part(part_path)
+                raise ValueError("server returned an unexpected range, restarting from scratch")
+            total = content_range[2] or state.get('total') or 0
+            if state.get('total') and total != state['total']:
+                self.discard_part(part_path)
+                raise ValueError("remote file size changed, restarting from scratch")
+            mode = 'ab'
+        else:
+            # Full response: the server ignored the range or the validator no longer matches
+            if offset:
+                self.progress.message(f"Remote file changed or range not supported, restarting '{file_name}' from scratch.")
+            offset = 0
+            total = int(headers.get('content-length', 0))
+            mode = 'wb'
+
+        # Without a validator there is nothing to check a later resume against
+        state = None
+        if etag or last_modified:
+            state = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'total': total,
+            }
+            if preallocate and total > offset:
+                state['written'] = offset
+            self.save_part_state(part_path, state)
+        else:
+            self.discard_part(part_path, keep_data=True)
+
+        return mode, offset, total, state
+
+    def checkpoint(self, key, part_path, state, position):
+        """Save how far a streamed download got: in the resume metadata of a preallocated file and in the journal"""
+        if state is not None and 'written' in state:
+            state['written'] = position
+            self.save_part_state(part_path, state)
+        if self.journal is not None:
+            self.journal.progress(key, position)
+
+    def finish_job(self, file, result):
+        """Record the DownloadResult of a file in the manifest, the journal, the metrics and the progress"""
+        key = self.manifest_key(result.path)
+        if result.status == 'done' and file is not None and self.manifest is not None:
+            self.manifest.record(key, file)
+        if self.journal is not None:
+            if result.ok:
+                self.journal.finish(key)
+            else:
+                self.journal.fail(key, result.error or "download failed")
+        self.metrics.file_finished(result.path, result.status)
+        self.progress.file_finished(result)
+
+    def download_result(self, url, file_path, success, started, transferred, checksum, attempts, error):
+        """Build the DownloadResult of a finished download"""
+        size = os.path.getsize(file_path) if success and os.path.exists(file_path) else None
+        return DownloadResult(url, file_path, 'done' if success else 'failed', bytes=transferred, size=size,
+                              duration=time.monotonic() - started, checksum=checksum if success else None,
+                              attempts=attempts, error=None if success else error)
+
+    def start_hash(self, checksum, part_path, offset):
+        """
+        Create the hasher for a download with a published checksum (None otherwise).
+        When resuming, the bytes already in the partial file are hashed first.
+        """
+        if checksum is None:
+            return None
+        hasher = hashlib.new(checksum[0])
+        if offset:
+            hash_file(part_path, checksum[0], offset, hasher)
+        return hasher
+
+    def check_part(self, file_name, part_path, file_path, total, checksum=None, hasher=None, downloaded=None):
+        """
+        Compare the partial file with the expected size and checksum and move it into place when complete.
+        `hasher` holds the digest computed while streaming; without it the partial file is hashed from disk.
+        `downloaded` is the number of bytes written when the partial file was preallocated (its size otherwise).
+        Returns True on success; an oversized or corrupt partial file is discarded.
+        """
+        if downloaded is None:
+            downloaded = os.path.getsize(part_path)
+        if total != 0 and downloaded != total:
+            self.progress.message(f"ERROR: Downloaded file size does not match expected size for '{file_name}'")
+            if downloaded > total:
+                self.discard_part(part_path)
+            return False
+        if checksum is not None:
+            algorithm, expected = checksum
+            digest = (hasher or hash_file(part_path, algorithm)).hexdigest()
+            if digest != expected:
+                self.progress.message(f"ERROR: {algorithm.upper()} checksum mismatch for '{file_name}', downloading it again")
+                self.discard_part(part_path)
+                return False
+        self.finalize_part(part_path, file_path)
+        self.progress.message(f"Successfully downloaded '{file_name}'!")
+        return True
+
     def download_file(self, url, retries=3):
-        """Download a file from URL to the destination folder with a progress bar"""
+        """
+        Download a file from URL to the destination folder, reporting progress to self.progress.
+        Data is written to '<name>.part' and resumed with HTTP Range requests across
+        retries and restarts; the file is only renamed into place once complete.
+        `url` may be a URL string or an ArchiveFile record; for records with a published
+        md5/sha1 the checksum is computed while streaming and a mismatch triggers a redownload.
+        Returns a DownloadResult.
+        """
 
-        file_name = unquote(os.path.basename(url))
-        file_path = os.path.join(self.destination_folder, file_name)
+        file = url if isinstance(url, ArchiveFile) else None
+        checksum = expected_checksum(url)
+        url, file_name, file_path = self.target_path(url)
+        part_path = file_path + self.PART_SUFFIX
+        key = self.manifest_key(file_path)
         
-        if os.path.exists(file_path):
-            print(f"File '{file_name}' already exists. Skipping.")
-            return
+        # In sync mode an existing file is only downloaded again when it changed upstream
+        skipped = self.skip_existing(file, file_name, file_path)
+        if skipped:
+            return skipped
         
+        self.metrics.file_started(file_path, url)
+        started = time.monotonic()
+        transferred = 0
+        attempts = 0
+        success = False
+        error = None
+        extractor = None
         for attempt in range(retries):
+            attempts += 1
+            if attempt:
+                self.metrics.retried(file_path)
             try:
+                plan = self.plan_segments(url, part_path, file.size if file is not None else None)
+                if plan:
+                    self.progress.message(f"Downloading {file_name}...")
+                    if self.journal is not None:
+                        segments = (self.load_part_state(part_path) or {}).get('segments', [])
+                        self.journal.start(key, sum(segment[2] - segment[0] for segment in segments))
+                    try:
+                        self.download_segmented(file_name, part_path, plan, attempt)
+                    finally:
+                        transferred += plan.get('received', 0)
+                    # Segments arrive out of order, so the checksum is computed from disk
+                    if self.check_part(file_name, part_path, file_path, plan['total'], checksum):
+                        success = True
+                        break
+                    raise ValueError("segmented download failed verification")
+
+                offset, state = self.resume_offset(url, part_path)
+                if offset:
+                    self.progress.message(f"Resuming download (attempt {attempt + 1}) at {human_readable_size(offset)}: {file_name}")
+                else:
+                    self.progress.message(f"Starting download (attempt {attempt + 1}): {file_name}")
+                if self.journal is not None:
+                    self.journal.start(key, offset)
+
                 # Make the request with a timeout
-                print(f"Starting download (attempt {attempt + 1}): {file_name}")
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()  # Raise exception for bad responses
-                
-                # Get file size for progress reporting
-                total_size_in_bytes = int(response.headers.get('content-length', 0))
-                file_size = human_readable_size(total_size_in_bytes)
-                print(f"File size: {file_size}")
-                
-                block_size = 8192  # 8 Kibibytes
-                
-                # Create a tqdm progress bar
-                print(f"Downloading {file_name}...")
-                progress_bar = tqdm(
-                    total=total_size_in_bytes,
-                    unit='iB',
-                    unit_scale=True,
-                    desc=file_name,
-                    bar_format='{l_bar}{bar:30}{r_bar}',
-                    ascii=False  # Use Unicode for the progress bar
-                )
-                
-                # Open file for writing in binary mode
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=block_size):
-                        if chunk:
-                            progress_bar.update(len(chunk))
-                            f.write(chunk)
-                
-                progress_bar.close()
+                with self.session.get(url, stream=True, timeout=30,
+                                      headers=self.resume_headers(offset, state)) as response:
+                    self.metrics.first_byte(file_path)
+                    if not (response.status_code == 416 and offset):
+                        response.raise_for_status()  # Raise exception for bad responses
+                    accepted = self.accept_response(url, file_name, part_path, offset, state,
+                                                    response.status_code, response.headers,
+                                                    preallocate=self.preallocate)
+                    if accepted is None:
+                        if self.check_part(file_name, part_path, file_path, offset, checksum, downloaded=offset):
+                            success = True
+                            break
+                        raise ValueError("partial file failed verification")
+                    mode, offset, total_size_in_bytes, state = accepted
+                    hasher = self.start_hash(checksum, part_path, offset)
+                    bucket = self.connection_bucket()
+                    extractor = self.start_extraction(file_name, file_path, offset)
+
+                    # Get file size for progress reporting
+                    file_size = human_readable_size(total_size_in_bytes)
+                    self.progress.message(f"File size: {file_size}")
+                    
+                    self.progress.message(f"Downloading {file_name}...")
+                    self.progress.file_started(file_path, file_name, total_size_in_bytes, offset)
+                    
+                    # The body is read into one reused buffer and written without intermediate copies;
+                    # progress, metrics and throttling are settled in batches rather than per read
+                    readinto = self.body_reader(response)
+                    buffer = memoryview(bytearray(self.buffer_size))
+                    position = offset
+                    reported = offset
+                    unsaved = 0
+                    last_report = time.monotonic()
+                    try:
+                        with self.open_part(part_path, mode, offset, total_size_in_bytes, state) as f:
+                            while True:
+                                received = readinto(buffer)
+                                if not received:
+                                    break
+                                view = buffer[:received]
+                                while view:
+                                    view = view[f.write(view):]
+                                if hasher:
+                                    hasher.update(buffer[:received])
+                                if extractor is not None:
+                                    extractor.feed(buffer[:received])
+                                position += received
+                                unsaved += received
+                                if unsaved >= self.SEGMENT_CHECKPOINT:
+                                    self.checkpoint(key, part_path, state, position)
+                                    unsaved = 0
+                                now = time.monotonic()
+                                if now - last_report >= self.PROGRESS_INTERVAL:
+                                    self.progress.advance(file_path, position - reported)
+                                    self.metrics.add_bytes(file_path, position - reported)
+                                    pause = self.throttle_delay(position - reported, bucket)
+                                    reported = position
+                                    if pause:
+                                        time.sleep(pause)
+                                    last_report = time.monotonic()
+                        self.release_response(response)
+                    finally:
+                        self.progress.advance(file_path, position - reported)
+                        self.metrics.add_bytes(file_path, position - reported)
+                        self.progress.file_stopped(file_path)
+                        transferred += position - offset
+                        if unsaved:
+                            self.checkpoint(key, part_path, state, position)
                 
                 # Check if the download completed successfully
-                if total_size_in_bytes != 0 and progress_bar.n != total_size_in_bytes:
-                    print(f"ERROR: Downloaded file size does not match expected size for '{file_name}'")
-                else:
-                    print(f"Successfully downloaded '{file_name}'!")
+                if self.check_part(file_name, part_path, file_path, total_size_in_bytes, checksum, hasher,
+                                   downloaded=position):
+                    success = True
                     break  # Exit the retry loop if successful
+                error = "incomplete or corrupt download"
+                if extractor is not None:
+                    extractor.abort()
+                    extractor = None
+                if attempt == retries - 1:
+                    self.progress.message(f"Failed to download '{file_name}' after {retries} attempts.")
+                else:
+                    self.progress.message("Retrying...")
+                    time.sleep(self.retry_delay(attempt))  # Wait before retrying
                 
             except Exception as e:
-                print(f"Error downloading '{file_name}' (attempt {attempt + 1}): {str(e)}")
+                error = str(e) or type(e).__name__
+                self.progress.message(f"Error downloading '{file_name}' (attempt {attempt + 1}): {str(e)}")
+                if extractor is not None:
+                    extractor.abort()
+                    extractor = None
                 if attempt == retries - 1:
-                    print(f"Failed to download '{file_name}' after {retries} attempts.")
+                    self.progress.message(f"Failed to download '{file_name}' after {retries} attempts.")
                 else:
-                    print("Retrying...")
-                    time.sleep(2)  # Wait before retrying
+                    self.progress.message("Retrying...")
+                    time.sleep(self.retry_delay(attempt, e))  # Wait before retrying
+        
+        if success and self.extract and not self.extract_download(file_name, file_path, extractor):
+            success, error = False, "extraction failed"
+        result = self.download_result(url, file_path, success, started, transferred,
+                                      checksum, attempts, error)
+        self.finish_job(file, result)
         
         # Add a slight delay between downloads to be nice to the server
-        time.sleep(1)
+        if self.delay:
+            time.sleep(self.delay)
+        return result
+    
+    def claim(self, url):
+        """
+        Claim a file in the shared work queue. Returns its key, or None if another process is
+        downloading it or, in sync mode, finished it since the listing was filtered.
+        """
+        _, _, file_path = self.target_path(url)
+        key = self.manifest_key(file_path)
+        if not self.work_queue.claim(key):
+            self.progress.message(f"File '{key}' is being downloaded by another process. Skipping.")
+            return None
+        # Sync mode does not skip existing files, so check whether the claim holder before us completed it
+        if self.manifest is not None and isinstance(url, ArchiveFile) and self.matches_local(url, file_path):
+            self.manifest.record(key, url)
+            self.work_queue.release(key)
+            self.progress.message(f"File '{key}' was downloaded by another process. Skipping.")
+            return None
+        return key
+
+    def run_download(self, url):
+        """
+        Run download_file, holding a slot of the adaptive concurrency controller when enabled
+        and the file's claim when a shared work queue is used. Returns a DownloadResult.
+        """
+        key = None
+        if self.work_queue is not None:
+            key = self.claim(url)
+            if key is None:
+                return DownloadResult(getattr(url, 'url', url), self.target_path(url)[2], 'skipped',
+                                      error="handled by another process")
+        try:
+            if self.concurrency is None:
+                return self.download_file(url)
+            with self.concurrency:
+                return self.download_file(url)
+        finally:
+            if key is not None:
+                self.work_queue.release(key)
     
-    def download_files(self, file_urls):
-        """Download multiple files from the provided list of URLs"""
+    def prepare_batch(self, file_urls, schedule=None):
+        """
+        Apply sync mode and the job journal to a batch of downloads and announce it.
+        `schedule` is called with the files left after sync filtering and returns the files to download,
+        e.g. ordered and limited by schedule_files. Iterables without a length reach it as a lazy iterator,
+        so their schedule must stay lazy too (e.g. itertools.islice to limit a streaming listing).
+        Returns (file_urls, total); total is None for iterables without a length.
+        """
+        total = len(file_urls) if hasattr(file_urls, '__len__') else None
+        if self.manifest is not None:
+            if total is not None:
+                file_urls = self.sync_filter(file_urls)
+            else:
+                file_urls = (file for file in file_urls if self.is_pending(file))
+        if schedule is not None:
+            file_urls = schedule(file_urls)
+        if total is not None:
+            total = len(file_urls)
+        if self.journal is not None:
+            file_urls = self.queue_jobs(file_urls)
+        if total is not None:
+            self.progress.message(f"Found {total} files to download.\n")
+        else:
+            self.progress.message("Downloading files as they are listed...\n")
+        return file_urls, total
+    
+    def finish_batch(self):
+        """
+        Save the manifest and close the metrics and progress once a batch is over.
+        The job journal and work queue stay open for further batches; their owner closes them.
+        """
+        if self.manifest is not None:
+            self.manifest.save()
+        self.metrics.close()
+        self.progress.close()
+    
+    def collect_finished(self, pending, return_when):
+        """Remove the downloads in `pending` that have finished. Returns their DownloadResults."""
+        done, _ = wait(pending, return_when=return_when)
+        self.update_connection_metrics()
+        results = []
+        for future in done:
+            url = pending.pop(future)
+            try:
+                results.append(future.result())
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                self.progress.message(f"Error downloading {getattr(url, 'url', url)}: {error}")
+                results.append(DownloadResult(getattr(url, 'url', url), self.target_path(url)[2], 'failed',
+                                              error=error))
+        return results
+    
+    def iter_downloads(self, file_urls, schedule=None):
+        """
+        Download multiple files from the provided list of URLs or ArchiveFile records,
+        yielding a DownloadResult as each one finishes (in completion order).
+        Any iterable works, e.g. a streaming collection listing: it is consumed lazily with a
+        bounded number of queued downloads, so downloads start while listing is still running.
+        Closing the generator early cancels the downloads that have not started yet.
+        `schedule` orders and limits the files left after sync filtering (see prepare_batch).
+        """
         try:
-            print(f"Found {len(file_urls)} files to download.\n")
+            file_urls, total = self.prepare_batch(file_urls, schedule)
+            file_urls = iter(file_urls)
+            
+            # Keep enough downloads queued to feed every worker without materializing the whole listing
+            queue_limit = self.max_concurrent_downloads * 2
+            completed = 0
             with ThreadPoolExecutor(max_workers=self.max_concurrent_downloads) as executor:
-                futures = {executor.submit(self.download_file, url): url for url in file_urls}
+                pending = {}
                 try:
-                    for i, future in enumerate(as_completed(futures), 1):
-                        url = futures[future]
-                        try:
-                            print(f"\nFile {i} of {len(file_urls)}")
-                            future.result()
-                        except Exception as e:
-                            print(f"Error downloading {url}: {str(e)}")
-                except KeyboardInterrupt:
-                    print("\nCTRL + C detected. Cancelling all downloads...")
+                    listing = True
+                    while True:
+                        while listing and len(pending) < queue_limit:
+                            url = next(file_urls, None)
+                            if url is None:
+                                listing = False
+                            else:
+                                pending[executor.submit(self.run_download, url)] = url
+                        self.metrics.set_queue_depth(len(pending))
+                        if not pending:
+                            break
+                        for result in self.collect_finished(pending, FIRST_COMPLETED):
+                            completed += 1
+                            self.progress.message(f"\nFile {completed} of {total}" if total is not None
+                                                  else f"\nFile {completed}")
+                            yield result
+                except (KeyboardInterrupt, GeneratorExit) as e:
+                    if isinstance(e, KeyboardInterrupt):
+                        self.progress.message("\nCTRL + C detected. Cancelling all downloads...")
                     # Cancel all pending futures
-                    for future in futures:
+                    for future in pending:
                         future.cancel()
                     # Wait for all futures to complete (cancelled or otherwise)
-                    for future in futures:
+                    for future in pending:
                         try:
                             future.result()
-                        except CancelledError:
-                            pass  # Ignore cancellation errors
-                    print("All downloads cancelled. Exiting gracefully.")
-                    return  # Exit the function immediately
-                
-            print("\nAll downloads completed!")
-        
+                        except (CancelledError, Exception):
+                            pass  # Ignore cancellation and download errors
+                    raise
+        finally:
+            self.update_connection_metrics()
+            self.finish_batch()
+    
+    def download_files(self, file_urls, schedule=None, keep_results=True):
+        """
+        Download multiple files from the provided list of URLs or ArchiveFile records
+        (see iter_downloads). Returns the list of DownloadResults in completion order;
+        with keep_results=False it stays empty, so memory does not grow with a long streaming listing.
+        """
+        results = []
+        try:
+            for result in self.iter_downloads(file_urls, schedule):
+                if keep_results:
+                    results.append(result)
         except KeyboardInterrupt:
-            print("\nDownload canceled by user. Exiting gracefully.")
\ No newline at end of file
+            self.progress.message("All downloads cancelled. Exiting gracefully.")
+            return results
+        self.progress.message("\nAll downloads completed!")
+        return results
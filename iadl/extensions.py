@@ -1,40 +1,38 @@
 # Archive formats
 ARCHIVE_EXTENSIONS = ['.7z', '.zip', '.rar', '.tar', '.gz', '.xz',
-                      '.lz', '.lzma', '.zst', '.tgz', '.tbz', '.tb2', '.tbz2'
+                      '.lz', '.lzma', '.zst', '.tgz', '.tbz', '.tb2', '.tbz2',
                       '.tar.gz', '.tar.bz2', '.tar.xz', '.tar.lzma', '.tar.zst',
-                      '.tar.lz', '.tar.lzma', '.tar.zst', '.tar.xz', '.tar.bzip2',
-                      '.tar.lzip', '.tar.lzop', '.tar.zlib', 'cab', 'arj', 'ace',
-                      'zoo', 'zipx', 'war', 'ear', 'tar.lzo', 'lzh',
-                      'lha', 'pax', 'cpio', 'bzip', 'bzip2', 'tbz', 'tb2', 'tbz2',
-                      'tbz2', 'tar.lzop', 'tar.lzip', 'tar.zlib', 'tar.bzip2', 'uue'
+                      '.tar.lz', '.tar.bzip2', '.tar.lzip', '.tar.lzop', '.tar.zlib',
+                      '.tar.lzo', '.cab', '.arj', '.ace', '.zoo', '.zipx', '.war', '.ear',
+                      '.lzh', '.lha', '.pax', '.cpio', '.bzip', '.bzip2', '.uue'
                     ]
 
 # Video formats
 VIDEO_EXTENSIONS = ['.avi', '.mov', '.wmv', '.mpg', '.mpeg', '.mp4',
-                    '.mkv', '.webm', '.flv', '.3gp', '.m4v', '.vob', '.ogv'
+                    '.mkv', '.webm', '.flv', '.3gp', '.m4v', '.vob', '.ogv',
                     '.gifv', '.mng', '.mts', '.m2ts', '.ts', '.divx', '.dv', '.f4v',
                     '.f4p', '.f4a', '.f4b', '.h264', '.h265', '.hevc', '.vp8', '.vp9', '.av1', '.xvid',
-                    '.qt', '.3gp', '.svi', '.rm', '.rmvb', '.asf', '.drc', '.mjpeg', '.mjpg', '.mp2v', '.mp4v',
+                    '.qt', '.svi', '.rm', '.rmvb', '.asf', '.drc', '.mjpeg', '.mjpg', '.mp2v', '.mp4v',
                     '.mpv', '.nsv', '.ogm', '.roq', '.srt', '.sub', '.idx', '.vtt']
 
 # Audio formats
-AUDIO_EXTENSIONS = ['.mp3', '.flac', 'alac', '.wav', '.aac', '.ogg', '.wma', '.opus', '.m4p', '.aiff']
+AUDIO_EXTENSIONS = ['.mp3', '.flac', '.alac', '.wav', '.aac', '.ogg', '.wma', '.opus', '.m4p', '.aiff']
 
 # Streaming formats
 STREAMING_EXTENSIONS = ['.m3u8', '.m3u', '.ts', '.m4s', '.mpd']
 
 # Audiobook formats
-AUDIOBOOK_EXTENSIONS = ['.m4b', 'm4p', '.m4a', 'm4b', '.aa', '.aax']
+AUDIOBOOK_EXTENSIONS = ['.m4b', '.m4p', '.m4a', '.aa', '.aax']
 
 # Disk image formats
-DISK_IMAGE_EXTENSIONS = ['.iso', '.img', '.bin', '.cue', '.dmg','.nrg', '.toast', 'raw', 
-                         'qcow', 'qcow2', '.vmdk', '.vdi', '.vhd', '.vhdx', 'hdd', 'hdi']
+DISK_IMAGE_EXTENSIONS = ['.iso', '.img', '.bin', '.cue', '.dmg', '.nrg', '.toast', '.raw',
+                         '.qcow', '.qcow2', '.vmdk', '.vdi', '.vhd', '.vhdx', '.hdd', '.hdi']
 
 # Document formats
 DOCUMENT_EXTENSIONS = ['.txt', '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx']
 
 # Executable formats
-EXECUTABLE_EXTENSIONS = ['.exe', '.msi', '.apk', '.deb', '.rpm', 'jar',]
+EXECUTABLE_EXTENSIONS = ['.exe', '.msi', '.apk', '.deb', '.rpm', '.jar']
 
 # Data formats
 DATA_EXTENSIONS = ['.txt', '.csv', '.json', '.xml', '.sqlite']
@@ -43,16 +41,16 @@ DATA_EXTENSIONS = ['.txt', '.csv', '.json', '.xml', '.sqlite']
 WEB_EXTENSIONS = ['.html', '.css', '.js']
 
 # Comic formats
-COMIC_EXTENSIONS = ['cbr', 'cbz', 'cb7', 'cbt', 'cba']
+COMIC_EXTENSIONS = ['.cbr', '.cbz', '.cb7', '.cbt', '.cba']
 
 # eBook formats
-EBOOK_EXTENSIONS = ['epub', '.mobi', 'lrf', 'lrx', 'pkg', 'opf', 'lit', 'ps',
-                    'djvu', '.azw', '.azw3', 'ibooks', 'kf8', 'kfx', 'opf', '.prc',
-                    'pdb', '.prc', '.fb2', 'fbz', '.fb2.zip', 'xeb', '.xhtml', 'ceb'
+EBOOK_EXTENSIONS = ['.epub', '.mobi', '.lrf', '.lrx', '.pkg', '.opf', '.lit', '.ps',
+                    '.djvu', '.azw', '.azw3', '.ibooks', '.kf8', '.kfx', '.prc',
+                    '.pdb', '.fb2', '.fbz', '.fb2.zip', '.xeb', '.xhtml', '.ceb'
 ]
 
 # Help formats
-HELP_EXTENSIONS = ['chm', '.hlp']
+HELP_EXTENSIONS = ['.chm', '.hlp']
 
 # Picture formats
 PICTURE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webm', '.jpeg2000', '.webp', '.hdr', '.heif', 
@@ -66,22 +64,80 @@ CONTAINER_EXTENSIONS = ['.afphoto', '.cd5', '.clip', '.cpt', '.kra', '.mdp', '.p
 # Torrent formats
 TORRENT_EXTENSIONS = ['.torrent']
 
+# Extensions by category name, in the order used to classify a suffix shared by several categories
+EXTENSION_CATEGORIES = {
+    'archive': ARCHIVE_EXTENSIONS,
+    'video': VIDEO_EXTENSIONS,
+    'audio': AUDIO_EXTENSIONS,
+    'streaming': STREAMING_EXTENSIONS,
+    'audiobook': AUDIOBOOK_EXTENSIONS,
+    'disk_image': DISK_IMAGE_EXTENSIONS,
+    'document': DOCUMENT_EXTENSIONS,
+    'executable': EXECUTABLE_EXTENSIONS,
+    'data': DATA_EXTENSIONS,
+    'web': WEB_EXTENSIONS,
+    'comic': COMIC_EXTENSIONS,
+    'ebook': EBOOK_EXTENSIONS,
+    'help': HELP_EXTENSIONS,
+    'picture': PICTURE_EXTENSIONS,
+    'container': CONTAINER_EXTENSIONS,
+    'torrent': TORRENT_EXTENSIONS,
+}
+
+def normalize_extensions(extensions):
+    """Lowercase extensions, add the leading dot where missing and drop duplicates (keeping order)"""
+    normalized = []
+    seen = set()
+    for ext in extensions:
+        ext = ext.strip().lower()
+        if not ext:
+            continue
+        if not ext.startswith('.'):
+            ext = '.' + ext
+        if ext not in seen:
+            seen.add(ext)
+            normalized.append(ext)
+    return normalized
+
 # All extensions
-ALL_EXTENSIONS = (
-    ARCHIVE_EXTENSIONS +
-    VIDEO_EXTENSIONS +
-    AUDIO_EXTENSIONS +
-    STREAMING_EXTENSIONS +
-    AUDIOBOOK_EXTENSIONS +
-    DISK_IMAGE_EXTENSIONS +
-    DOCUMENT_EXTENSIONS +
-    EXECUTABLE_EXTENSIONS +
-    DATA_EXTENSIONS +
-    WEB_EXTENSIONS +
-    COMIC_EXTENSIONS +
-    EBOOK_EXTENSIONS +
-    HELP_EXTENSIONS +
-    PICTURE_EXTENSIONS +
-    CONTAINER_EXTENSIONS +
-    TORRENT_EXTENSIONS
-)
\ No newline at end of file
+ALL_EXTENSIONS = normalize_extensions(
+    ext for extensions in EXTENSION_CATEGORIES.values() for ext in extensions
+)
+
+class ExtensionIndex:
+    def __init__(self, extensions=None, categories=None):
+        """
+        Precomputed suffix lookup for matching file names against extensions.
+        Suffixes are grouped by length, so a name is matched with one set lookup per
+        distinct suffix length (longest first) instead of one endswith() per extension.
+        `extensions` limits the index to those extensions (all known ones if None);
+        `categories` maps category names to extension lists (EXTENSION_CATEGORIES by default).
+        """
+        categories = EXTENSION_CATEGORIES if categories is None else categories
+        self.categories = {}
+        for category, category_extensions in categories.items():
+            for ext in normalize_extensions(category_extensions):
+                self.categories.setdefault(ext, category)
+        
+        selected = normalize_extensions(ALL_EXTENSIONS if extensions is None else extensions)
+        self.suffixes = frozenset(selected)
+        self.lengths = sorted({len(ext) for ext in selected}, reverse=True)
+    
+    def match(self, name):
+        """Return the longest indexed extension the name ends with (case-insensitive), or None"""
+        name = name.lower()
+        for length in self.lengths:
+            suffix = name[-length:]
+            if suffix in self.suffixes and len(name) > length:
+                return suffix
+        return None
+    
+    def classify(self, name):
+        """Return (extension, category) for the longest matching extension, or (None, None)"""
+        suffix = self.match(name)
+        if suffix is None:
+            return None, None
+        return suffix, self.categories.get(suffix)
+    
+    def __contains__(self, name):
+        return self.match(name) is not None
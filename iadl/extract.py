@@ -0,0 +1,203 @@
+import os
+import queue
+import shutil
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Archive suffixes that can be extracted, longest first so '.tar.gz' wins over '.gz'
+TAR_SUFFIXES = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tbz2', '.txz', '.tar')
+ZIP_SUFFIXES = ('.zip',)
+
+# Suffix of the folder an archive is extracted to before it is moved into place
+EXTRACTING_SUFFIX = '.extracting'
+
+def archive_kind(name):
+    """Return 'tar' or 'zip' for an archive that can be extracted, None otherwise"""
+    name = name.lower()
+    if name.endswith(TAR_SUFFIXES):
+        return 'tar'
+    if name.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    return None
+
+def extraction_folder(archive_path):
+    """Folder an archive is extracted to: next to it, named without the archive suffix"""
+    lower = archive_path.lower()
+    for suffix in TAR_SUFFIXES + ZIP_SUFFIXES:
+        if lower.endswith(suffix):
+            return archive_path[:-len(suffix)]
+    return archive_path + '.d'
+
+def check_member(name, folder):
+    """Raise ValueError for an archive member that would be written outside `folder`"""
+    folder = os.path.realpath(folder)
+    path = os.path.realpath(os.path.join(folder, name))
+    if os.path.isabs(name) or os.path.commonpath([folder, path]) != folder:
+        raise ValueError(f"unsafe path in archive: {name}")
+
+def safe_tar_members(tar, folder):
+    """
+    Yield the members of a tar archive, rejecting anything that could escape `folder`.
+    Only used on Pythons without tarfile's 'data' extraction filter.
+    """
+    for member in tar:
+        check_member(member.name, folder)
+        if member.islnk() or member.issym():
+            target = member.linkname if member.islnk() else os.path.join(os.path.dirname(member.name),
+                                                                          member.linkname)
+            check_member(target, folder)
+        elif not (member.isfile() or member.isdir()):
+            continue  # Devices and FIFOs are skipped
+        yield member
+
+def extract_tar(tar, folder):
+    """Extract every member of an open tar archive (regular or stream mode) into `folder`"""
+    if hasattr(tarfile, 'data_filter'):
+        tar.extractall(folder, filter='data')
+    else:
+        tar.extractall(folder, members=safe_tar_members(tar, folder))
+
+def zip_member_path(folder, name):
+    """Path zipfile extracts a member to: empty, '.' and '..' parts of its name are dropped"""
+    parts = [part for part in name.replace(os.path.sep, '/').split('/')
+             if part not in ('', os.path.curdir, os.path.pardir)]
+    return os.path.join(folder, *parts)
+
+def extract_zip(path, folder, workers=4):
+    """
+    Extract a zip archive into `folder`, with members spread over `workers` threads.
+    Each thread reads through its own handle; decompression releases the GIL.
+    """
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+    for member in members:
+        check_member(member.filename, folder)
+    # zipfile creates missing parent folders without exist_ok, so two threads extracting into the
+    # same new folder can collide: every folder is created up front instead
+    folders = {folder}
+    for member in members:
+        target = zip_member_path(folder, member.filename)
+        folders.add(target if member.is_dir() else os.path.dirname(target))
+    for path_folder in sorted(folders):
+        os.makedirs(path_folder, exist_ok=True)
+    groups = [members[i::workers] for i in range(workers)]
+
+    def extract_group(group):
+        with zipfile.ZipFile(path) as archive:
+            for member in group:
+                archive.extract(member, folder)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(extract_group, [group for group in groups if group]))
+
+def replace_folder(source, target):
+    """Move an extracted folder into place, replacing an earlier extraction"""
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(source, target)
+
+def extract_archive(path, workers=4):
+    """
+    Extract a downloaded archive next to it (see extraction_folder).
+    Members are extracted to a temporary folder first, so an interrupted extraction never
+    leaves a half-filled folder under the final name. Returns the folder.
+    """
+    folder = extraction_folder(path)
+    temporary = folder + EXTRACTING_SUFFIX
+    shutil.rmtree(temporary, ignore_errors=True)
+    try:
+        if archive_kind(path) == 'zip':
+            extract_zip(path, temporary, workers)
+        else:
+            with tarfile.open(path, 'r:*') as tar:
+                extract_tar(tar, temporary)
+    except BaseException:
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+    replace_folder(temporary, folder)
+    return folder
+
+class ChunkPipe:
+    """Read-only file object over chunks handed over through a bounded queue"""
+
+    def __init__(self, max_chunks=32):
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.current = b''
+        self.position = 0
+        self.eof = False
+
+    def read(self, size=-1):
+        # tarfile reads in small blocks: slice the current chunk rather than rebuilding a buffer
+        parts = []
+        while size != 0 and not self.eof:
+            if self.position >= len(self.current):
+                chunk = self.chunks.get()
+                if chunk is None:
+                    self.eof = True
+                else:
+                    self.current, self.position = chunk, 0
+                continue
+            end = len(self.current) if size < 0 else min(len(self.current), self.position + size)
+            parts.append(self.current[self.position:end])
+            if size > 0:
+                size -= end - self.position
+            self.position = end
+        return b''.join(parts)
+
+class StreamingTarExtractor:
+    def __init__(self, archive_path):
+        """
+        Extract a tar archive (optionally gzip/bzip2/xz compressed) while it downloads.
+        Chunks passed to feed() are decompressed and unpacked by a background thread into a
+        temporary folder, so the archive never has to be read back from disk. The
+        extraction is only moved into place by commit(), once the download is verified.
+        """
+        self.folder = extraction_folder(archive_path)
+        self.temporary = self.folder + EXTRACTING_SUFFIX
+        shutil.rmtree(self.temporary, ignore_errors=True)
+        self.pipe = ChunkPipe()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            with tarfile.open(fileobj=self.pipe, mode='r|*') as tar:
+                extract_tar(tar, self.temporary)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Drain what follows the end of the archive so feed() never blocks
+            while self.pipe.read(65536):
+                pass
+
+    def feed(self, data):
+        """Pass the next chunk of the archive (copied, so the caller may reuse its buffer)"""
+        data = bytes(data)
+        while self.thread.is_alive():
+            try:
+                self.pipe.chunks.put(data, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def finish(self):
+        """Signal the end of the archive and wait for the extraction. Returns True if it succeeded."""
+        self.pipe.chunks.put(None)
+        self.thread.join()
+        return self.error is None
+
+    def commit(self):
+        """Move the finished extraction into place. Returns the folder."""
+        replace_folder(self.temporary, self.folder)
+        return self.folder
+
+    def abort(self):
+        """Stop the extraction and remove what was extracted so far"""
+        if self.thread.is_alive():
+            self.error = self.error or ValueError("extraction aborted")
+            self.pipe.chunks.put(None)
+            self.thread.join()
+        shutil.rmtree(self.temporary, ignore_errors=True)
@@ -0,0 +1,70 @@
+import os
+from urllib.parse import quote, unquote
+
+class ArchiveFile:
+    """A single file of an Internet Archive item, as listed by the metadata API (or the details page)"""
+
+    def __init__(self, item_id, name, url, size=None, md5=None, sha1=None, mtime=None, format=None, source=None):
+        self.item_id = item_id
+        self.name = name
+        self.url = url
+        self.size = size
+        self.md5 = md5
+        self.sha1 = sha1
+        self.mtime = mtime
+        self.format = format
+        self.source = source
+
+    @classmethod
+    def from_metadata(cls, base_url, item_id, entry):
+        """Build a file record from one entry of the 'files' list returned by /metadata/<item_id>"""
+        def as_int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        name = entry['name']
+        return cls(
+            item_id=item_id,
+            name=name,
+            url=f"{base_url}/download/{item_id}/{quote(name)}",
+            size=as_int(entry.get('size')),
+            md5=entry.get('md5'),
+            sha1=entry.get('sha1'),
+            mtime=as_int(entry.get('mtime')),
+            format=entry.get('format'),
+            source=entry.get('source'),
+        )
+
+    def __repr__(self):
+        return f"ArchiveFile(item_id={self.item_id!r}, name={self.name!r}, size={self.size!r})"
+
+def relative_name(name):
+    """
+    Turn the name of a listed file ('disc1/track01.mp3') into a path relative to the item folder.
+    Returns None for names that are absolute or contain '..', which could escape the folder.
+    """
+    parts = name.replace('\\', '/').split('/')
+    if name.startswith(('/', '\\')) or os.path.isabs(name) or os.path.splitdrive(name)[0] or '..' in parts:
+        return None
+    parts = [part for part in parts if part not in ('', '.')]
+    return os.path.join(*parts) if parts else None
+
+def target_path(folder, file, item_subfolders=False):
+    """
+    Resolve where a download is saved in `folder`.
+    `file` may be a URL string or an ArchiveFile record; returns (url, file_name, file_path).
+    Records keep the folders of their name ('disc1/track01.mp3'), so files with the same base name
+    do not collide; unsafe names fall back to the base name of the URL.
+    If item_subfolders is True, records are saved under '<folder>/<item_id>/'.
+    """
+    if isinstance(file, ArchiveFile):
+        if item_subfolders and file.item_id:
+            folder = os.path.join(folder, file.item_id)
+        relative = relative_name(file.name) if file.name else None
+        if relative is not None:
+            return file.url, relative.replace(os.sep, '/'), os.path.join(folder, relative)
+        file = file.url
+    file_name = unquote(os.path.basename(file))
+    return file, file_name, os.path.join(folder, file_name)
@@ -0,0 +1,145 @@
+import os
+import time
+import sqlite3
+import threading
+from iadl.files import ArchiveFile
+
+# Job states
+PENDING = 'pending'
+IN_PROGRESS = 'in-progress'
+DONE = 'done'
+FAILED = 'failed'
+
+class JobJournal:
+    # Name of the journal database kept in the destination folder
+    FILE_NAME = '.iadl-jobs.db'
+    # Fields of an ArchiveFile stored with each job
+    FIELDS = ('item_id', 'name', 'url', 'size', 'md5', 'sha1', 'mtime')
+
+    def __init__(self, folder):
+        """
+        Open (or create) the job journal of a destination folder.
+        Every queued file is a row holding its listing record and its state: pending,
+        in-progress with the bytes already on disk, done, or failed with the reason.
+        Each change is committed as it happens, so after a crash or reboot the unfinished
+        jobs can be downloaded again without listing the items.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(os.path.abspath(folder), self.FILE_NAME)
+        self.lock = threading.Lock()
+        # Autocommit; the lock serializes the download threads on the one connection
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                item_id TEXT,
+                name TEXT,
+                url TEXT NOT NULL,
+                size INTEGER,
+                md5 TEXT,
+                sha1 TEXT,
+                mtime INTEGER,
+                state TEXT NOT NULL,
+                offset INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                reason TEXT,
+                updated REAL NOT NULL
+            )""")
+
+    def row(self, key, file):
+        """Column values of a job for a URL string or an ArchiveFile"""
+        if not isinstance(file, ArchiveFile):
+            file = ArchiveFile(None, key.rsplit('/', 1)[-1], file)
+        return (key,) + tuple(getattr(file, field) for field in self.FIELDS) + (PENDING, time.time())
+
+    def add(self, jobs):
+        """
+        Queue (key, file) pairs in one transaction.
+        Jobs already in the journal are queued again unless they are done and the listing
+        still describes the same version of the file.
+        """
+        rows = [self.row(key, file) for key, file in jobs]
+        if not rows:
+            return
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany("""
+                    INSERT INTO jobs (key, item_id, name, url, size, md5, sha1, mtime, state, updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        state = CASE WHEN jobs.state = 'done'
+                                      AND jobs.size IS excluded.size AND jobs.mtime IS excluded.mtime
+                                      AND jobs.md5 IS excluded.md5 AND jobs.sha1 IS excluded.sha1
+                                 THEN 'done' ELSE 'pending' END,
+                        item_id = excluded.item_id, name = excluded.name, url = excluded.url,
+                        size = excluded.size, md5 = excluded.md5, sha1 = excluded.sha1,
+                        mtime = excluded.mtime, updated = excluded.updated
+                    """, rows)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def track(self, jobs):
+        """Queue (key, file) pairs from an iterable as they are consumed, yielding each file"""
+        for key, file in jobs:
+            self.add([(key, file)])
+            yield file
+
+    def update(self, key, sql, *params):
+        with self.lock:
+            self.db.execute(f"UPDATE jobs SET {sql}, updated = ? WHERE key = ?", params + (time.time(), key))
+
+    def start(self, key, offset=0):
+        """Mark a job in progress, with `offset` bytes already on disk"""
+        self.update(key, "state = ?, offset = ?, attempts = attempts + 1, reason = NULL", IN_PROGRESS, offset)
+
+    def progress(self, key, offset):
+        """Record how many bytes of an in-progress job are on disk"""
+        self.update(key, "offset = ?", offset)
+
+    def finish(self, key):
+        """Mark a job done"""
+        self.update(key, "state = ?, reason = NULL", DONE)
+
+    def fail(self, key, reason):
+        """Mark a job failed after all retries"""
+        self.update(key, "state = ?, reason = ?", FAILED, str(reason))
+
+    def unfinished(self):
+        """Return [(key, ArchiveFile), ...] for the pending and interrupted jobs, in the order they were queued"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT key, {', '.join(self.FIELDS)} FROM jobs WHERE state IN (?, ?) ORDER BY rowid",
+                (PENDING, IN_PROGRESS)).fetchall()
+        return [(row[0], ArchiveFile(*row[1:])) for row in rows]
+
+    def failures(self):
+        """Return [(key, reason), ...] for the failed jobs"""
+        with self.lock:
+            return self.db.execute("SELECT key, reason FROM jobs WHERE state = ? ORDER BY rowid",
+                                   (FAILED,)).fetchall()
+
+    def retry_failed(self):
+        """Queue every failed job again. Returns the number of jobs re-queued."""
+        with self.lock:
+            cursor = self.db.execute("UPDATE jobs SET state = ?, reason = NULL, updated = ? WHERE state = ?",
+                                     (PENDING, time.time(), FAILED))
+            return cursor.rowcount
+
+    def keys(self):
+        """Return the keys of every job in the journal"""
+        with self.lock:
+            return {row[0] for row in self.db.execute("SELECT key FROM jobs").fetchall()}
+
+    def counts(self):
+        """Return {state: number of jobs}"""
+        with self.lock:
+            return dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.close()
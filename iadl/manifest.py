@@ -0,0 +1,90 @@
+import os
+import json
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not serialized between processes
+    fcntl = None
+
+class SyncManifest:
+    # Name of the manifest file kept in the destination folder
+    FILE_NAME = '.iadl-manifest.json'
+    # Number of recorded downloads between two saves of the manifest
+    SAVE_EVERY = 50
+
+    def __init__(self, folder):
+        """
+        Load (or start) the sync manifest of a destination folder.
+        For every downloaded file it records the size, mtime and checksums from the item
+        listing plus the source URL, so later runs can tell unchanged files apart
+        without touching them on disk.
+        """
+        self.path = os.path.join(os.path.abspath(folder), self.FILE_NAME)
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.changed = set()  # Keys recorded by this process since the last save
+        self.unreadable = False  # Set when an existing manifest could not be parsed (it is started over)
+        self.entries = self.load()
+    
+    def load(self):
+        """Read the entries saved on disk (empty if there is no readable manifest)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            self.unreadable = True
+            return {}
+    
+    def is_current(self, key, file):
+        """True if the manifest entry for `key` describes the same upstream version as the listed ArchiveFile"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        # Only compare what the listing provides (the details page fallback has no size or checksums)
+        for field in ('size', 'mtime', 'md5', 'sha1'):
+            value = getattr(file, field, None)
+            if value is not None and entry.get(field) != value:
+                return False
+        return True
+    
+    def record(self, key, file):
+        """Remember that the listed version of a file has been downloaded to `key`"""
+        with self.lock:
+            self.entries[key] = {
+                'size': file.size,
+                'mtime': file.mtime,
+                'md5': file.md5,
+                'sha1': file.sha1,
+                'url': file.url,
+            }
+            self.changed.add(key)
+            self.unsaved += 1
+            if self.unsaved >= self.SAVE_EVERY:
+                self.save_locked()
+    
+    def save(self):
+        """Write the manifest to disk atomically"""
+        with self.lock:
+            self.save_locked()
+    
+    def save_locked(self):
+        """
+        Merge the entries recorded here into the manifest on disk, which other processes sharing
+        the destination folder (see WorkQueue) may have saved meanwhile, and write it back.
+        """
+        with open(self.path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            entries = dict(self.entries)
+            entries.update(self.load())
+            entries.update((key, self.entries[key]) for key in self.changed)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'files': entries}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        self.entries = entries
+        self.changed = set()
+        self.unsaved = 0
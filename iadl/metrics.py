@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import threading
+
+class NullMetrics:
+    """Metrics sink that ignores everything, used when no metrics output is requested"""
+
+    def file_started(self, key, url=None):
+        pass
+
+    def first_byte(self, key):
+        pass
+
+    def add_bytes(self, key, amount):
+        pass
+
+    def retried(self, key):
+        pass
+
+    def file_finished(self, key, status):
+        pass
+
+    def set_queue_depth(self, depth):
+        pass
+
+    def set_connections(self, opened, requests):
+        pass
+
+    def close(self):
+        pass
+
+class DownloadMetrics(NullMetrics):
+    def __init__(self, json_path=None, prometheus_path=None, export_interval=10.0):
+        """
+        Collect per-file and aggregate download metrics: bytes, duration, throughput,
+        time to first byte, retries, connection reuse and download queue depth.
+        Finished files are appended to `json_path` as JSON lines (followed by a summary line on close);
+        `prometheus_path` is rewritten with the aggregate counters at most every export_interval seconds,
+        in the node_exporter textfile format.
+        """
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.export_interval = export_interval
+        self.lock = threading.Lock()
+        self.export_lock = threading.Lock()  # One Prometheus export at a time: they share the temporary file
+        self.started = time.monotonic()
+        self.last_export = 0.0
+        self.active = {}
+        self.totals = {'done': 0, 'failed': 0, 'skipped': 0}
+        self.bytes_total = 0
+        self.retries_total = 0
+        self.ttfb_sum = 0.0
+        self.ttfb_count = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.connections_opened = 0
+        self.requests_sent = 0
+        if json_path:
+            open(json_path, 'w').close()
+    
+    def file_started(self, key, url=None):
+        with self.lock:
+            self.active[key] = {
+                'file': key,
+                'url': url,
+                'started': time.monotonic(),
+                'request_started': time.monotonic(),
+                'ttfb': None,
+                'bytes': 0,
+                'retries': 0,
+            }
+    
+    def first_byte(self, key):
+        """Record the time from the start of the file's current request to its response headers"""
+        with self.lock:
+            record = self.active.get(key)
+            if record is None:
+                return
+            ttfb = time.monotonic() - record['request_started']
+            if record['ttfb'] is None:
+                record['ttfb'] = ttfb
+                self.ttfb_sum += ttfb
+                self.ttfb_count += 1
+    
+    def add_bytes(self, key, amount):
+        with self.lock:
+            record = self.active.get(key)
+            if record is not None:
+                record['bytes'] += amount
+            self.bytes_total += amount
+    
+    def retried(self, key):
+        with self.lock:
+            record = self.active.get(key)
+            if record is not None:
+                record['retries'] += 1
+                record['request_started'] = time.monotonic()
+            self.retries_total += 1
+    
+    def file_finished(self, key, status):
+        """Close a file's record with status 'done', 'failed' or 'skipped' and export it"""
+        with self.lock:
+            record = self.active.pop(key, None) or {'file': key, 'started': time.monotonic(), 'bytes': 0,
+                                                     'retries': 0, 'ttfb': None, 'url': None}
+            self.totals[status] = self.totals.get(status, 0) + 1
+            duration = time.monotonic() - record['started']
+            line = {
+                'type': 'file',
+                'file': record['file'],
+                'url': record['url'],
+                'status': status,
+                'bytes': record['bytes'],
+                'duration': round(duration, 6),
+                'bytes_per_sec': round(record['bytes'] / duration, 1) if duration > 0 else None,
+                'ttfb': round(record['ttfb'], 6) if record['ttfb'] is not None else None,
+                'retries': record['retries'],
+            }
+            export = time.monotonic() - self.last_export >= self.export_interval
+            if export:
+                self.last_export = time.monotonic()  # Claim this export so other threads skip it
+            # Metrics are best-effort: a failed export must never fail the download it describes
+            if self.json_path:
+                try:
+                    with open(self.json_path, 'a') as f:
+                        f.write(json.dumps(line) + '\n')
+                except OSError:
+                    pass
+        if export:
+            try:
+                self.write_prometheus()
+            except OSError:
+                pass  # Retried at the next export
+    
+    def set_queue_depth(self, depth):
+        with self.lock:
+            self.queue_depth = depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+    
+    def set_connections(self, opened, requests):
+        """Record how many connections were opened for how many requests (reuse = 1 - opened/requests)"""
+        with self.lock:
+            self.connections_opened = opened
+            self.requests_sent = requests
+    
+    def summary(self):
+        """Aggregate metrics for the run so far"""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                'type': 'summary',
+                'files_done': self.totals.get('done', 0),
+                'files_failed': self.totals.get('failed', 0),
+                'files_skipped': self.totals.get('skipped', 0),
+                'files_active': len(self.active),
+                'bytes': self.bytes_total,
+                'elapsed': round(elapsed, 6),
+                'bytes_per_sec': round(self.bytes_total / elapsed, 1) if elapsed > 0 else None,
+                'ttfb_avg': round(self.ttfb_sum / self.ttfb_count, 6) if self.ttfb_count else None,
+                'retries': self.retries_total,
+                'connections_opened': self.connections_opened,
+                'requests_sent': self.requests_sent,
+                'connection_reuse': (round(1 - self.connections_opened / self.requests_sent, 4)
+                                     if self.requests_sent else None),
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+            }
+    
+    def write_prometheus(self):
+        """Rewrite the Prometheus textfile with the aggregate metrics"""
+        if not self.prometheus_path:
+            return
+        summary = self.summary()
+        metrics = [
+            ('iadl_files_total', 'counter', 'Files processed by status',
+             [(f'{{status="{status}"}}', summary[f'files_{status}']) for status in ('done', 'failed', 'skipped')]),
+            ('iadl_files_active', 'gauge', 'Files currently downloading', [('', summary['files_active'])]),
+            ('iadl_bytes_total', 'counter', 'Bytes downloaded', [('', summary['bytes'])]),
+            ('iadl_bytes_per_second', 'gauge', 'Average download rate', [('', summary['bytes_per_sec'] or 0)]),
+            ('iadl_ttfb_seconds_avg', 'gauge', 'Average time to first byte', [('', summary['ttfb_avg'] or 0)]),
+            ('iadl_retries_total', 'counter', 'Download attempts retried', [('', summary['retries'])]),
+            ('iadl_connections_opened_total', 'counter', 'HTTP connections opened',
+             [('', summary['connections_opened'])]),
+            ('iadl_requests_total', 'counter', 'HTTP requests sent', [('', summary['requests_sent'])]),
+            ('iadl_queue_depth', 'gauge', 'Downloads queued or running', [('', summary['queue_depth'])]),
+        ]
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+        # Write atomically so the node_exporter never reads a half-written file
+        tmp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+        with self.export_lock:
+            with open(tmp_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, self.prometheus_path)
+        with self.lock:
+            self.last_export = time.monotonic()
+    
+    def close(self):
+        """Write the final summary line and Prometheus textfile"""
+        if self.json_path:
+            with open(self.json_path, 'a') as f:
+                f.write(json.dumps(self.summary()) + '\n')
+        self.write_prometheus()
@@ -0,0 +1,148 @@
+import threading
+
+class DownloadResult:
+    """The outcome of one download, returned by the downloaders instead of being printed"""
+
+    def __init__(self, url, path, status, bytes=0, size=None, duration=0.0, checksum=None, attempts=0,
+                 error=None):
+        self.url = url
+        self.path = path
+        self.status = status          # 'done', 'skipped' or 'failed'
+        self.bytes = bytes            # Bytes transferred by this run
+        self.size = size              # Size of the file on disk when done
+        self.duration = duration      # Seconds spent on the download
+        self.checksum = checksum      # (algorithm, hex digest) verified for the file, if any
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def ok(self):
+        """True if the file is in place (downloaded now or before)"""
+        return self.status != 'failed'
+
+    def __repr__(self):
+        return (f"DownloadResult(path={self.path!r}, status={self.status!r}, bytes={self.bytes!r}, "
+                f"duration={self.duration:.2f}, error={self.error!r})")
+
+class ProgressEvent:
+    """One progress report, as passed to CallbackProgress and yielded by the async event iterator"""
+
+    def __init__(self, kind, path=None, name=None, done=0, total=None, message=None, result=None):
+        self.kind = kind              # 'message', 'started', 'progress' or 'finished'
+        self.path = path
+        self.name = name
+        self.done = done              # Bytes of the file on disk so far
+        self.total = total            # Expected size of the file, if known
+        self.message = message
+        self.result = result          # DownloadResult of a 'finished' event
+
+    def __repr__(self):
+        return f"ProgressEvent(kind={self.kind!r}, path={self.path!r}, done={self.done!r}, total={self.total!r})"
+
+class NullProgress:
+    """Progress consumer that ignores every report, for headless use"""
+
+    def message(self, text):
+        pass
+
+    def batch_started(self, total_bytes=None):
+        pass
+
+    def file_started(self, path, name, total, offset=0):
+        pass
+
+    def advance(self, path, amount):
+        pass
+
+    def file_stopped(self, path):
+        """The transfer started by file_started ended (the file may still be retried)"""
+
+    def file_finished(self, result):
+        pass
+
+    def close(self):
+        pass
+
+class PrintProgress(NullProgress):
+    """Print messages to stdout, without progress bars"""
+
+    def message(self, text):
+        print(text)
+
+class TqdmProgress(PrintProgress):
+    def __init__(self, aggregate=False):
+        """
+        The command line output: messages on stdout and a tqdm progress bar per file,
+        or with aggregate=True a single bar for the whole batch.
+        """
+        self.aggregate = aggregate
+        self.bars = {}
+        self.total_bar = None
+        self.lock = threading.Lock()
+
+    def new_bar(self, **kwargs):
+        from tqdm import tqdm
+        return tqdm(unit='iB', unit_scale=True, bar_format='{l_bar}{bar:30}{r_bar}', **kwargs)
+
+    def batch_started(self, total_bytes=None):
+        if self.aggregate:
+            self.total_bar = self.new_bar(total=total_bytes or None, desc='Total')
+
+    def file_started(self, path, name, total, offset=0):
+        if self.aggregate:
+            if self.total_bar is not None:
+                self.total_bar.update(offset)  # Bytes already on disk count as done
+            return
+        bar = self.new_bar(total=total, initial=offset, desc=name, ascii=False)
+        with self.lock:
+            self.bars[path] = bar
+
+    def file_stopped(self, path):
+        with self.lock:
+            bar = self.bars.pop(path, None)
+        if bar is not None:
+            bar.close()
+
+    def advance(self, path, amount):
+        bar = self.total_bar if self.aggregate else self.bars.get(path)
+        if bar is not None and amount:
+            bar.update(amount)
+
+    def file_finished(self, result):
+        if self.aggregate and result.status == 'skipped' and self.total_bar is not None and result.size:
+            self.total_bar.update(result.size)  # Its size is part of the batch total but never transferred
+        self.file_stopped(result.path)
+
+    def close(self):
+        if self.total_bar is not None:
+            self.total_bar.close()
+            self.total_bar = None
+
+class CallbackProgress(NullProgress):
+    def __init__(self, callback):
+        """
+        Pass every report to callback(ProgressEvent). The callback is called from the download
+        threads (or the event loop of the async engine), so it should return quickly.
+        """
+        self.callback = callback
+        self.done = {}
+        self.totals = {}
+        self.lock = threading.Lock()  # Segments of one file report from several threads
+
+    def message(self, text):
+        self.callback(ProgressEvent('message', message=text))
+
+    def file_started(self, path, name, total, offset=0):
+        self.done[path] = offset
+        self.totals[path] = total
+        self.callback(ProgressEvent('started', path=path, name=name, done=offset, total=total))
+
+    def advance(self, path, amount):
+        with self.lock:
+            done = self.done[path] = self.done.get(path, 0) + amount
+        self.callback(ProgressEvent('progress', path=path, done=done, total=self.totals.get(path)))
+
+    def file_finished(self, result):
+        self.done.pop(result.path, None)
+        self.callback(ProgressEvent('finished', path=result.path, done=result.size or 0,
+                                    total=self.totals.pop(result.path, None), result=result))
@@ -0,0 +1,60 @@
+from fnmatch import fnmatch
+from iadl.units import human_readable_size
+
+# Download order policies accepted by schedule_files
+ORDER_POLICIES = ('listing', 'largest', 'smallest')
+
+def priority_rank(file, priorities):
+    """Index of the first priority pattern matching the file name (case-insensitive), len(priorities) if none"""
+    name = getattr(file, 'name', None) or str(getattr(file, 'url', file))
+    name = name.lower()
+    for rank, pattern in enumerate(priorities):
+        if fnmatch(name, pattern.lower()):
+            return rank
+    return len(priorities)
+
+def schedule_files(files, order='listing', priorities=None, max_bytes=None, limit=0, progress=None):
+    """
+    Order files for download and apply the count and byte budgets.
+    Files matching earlier `priorities` patterns (fnmatch, e.g. '*.iso') come first; within the same
+    priority they follow `order`: 'listing' keeps the listing order, 'largest' puts big files first
+    so a large straggler does not stretch the end of the run, 'smallest' gets many files done early.
+    Files of unknown size are placed after sized ones when ordering by size.
+    `limit` caps the number of files and `max_bytes` their total size; files that would exceed
+    the byte budget (or have no known size) are skipped. The budget is reported to `progress`, if given.
+    """
+    if order not in ORDER_POLICIES:
+        raise ValueError(f"unknown order policy: {order}")
+    priorities = priorities or []
+    
+    def sort_key(indexed):
+        position, file = indexed
+        size = getattr(file, 'size', None)
+        if order == 'largest':
+            by_size = (size is None, -(size or 0))
+        elif order == 'smallest':
+            by_size = (size is None, size or 0)
+        else:
+            by_size = ()
+        return (priority_rank(file, priorities),) + by_size + (position,)
+    
+    ordered = [file for _, file in sorted(enumerate(files), key=sort_key)]
+    
+    scheduled = []
+    total = 0
+    skipped = 0
+    for file in ordered:
+        if limit > 0 and len(scheduled) >= limit:
+            break
+        if max_bytes is not None:
+            size = getattr(file, 'size', None)
+            if size is None or total + size > max_bytes:
+                skipped += 1
+                continue
+            total += size
+        scheduled.append(file)
+    
+    if max_bytes is not None and progress is not None:
+        progress.message(f"Scheduled {len(scheduled)} files ({human_readable_size(total)}) within the "
+                         f"{human_readable_size(max_bytes)} budget; skipped {skipped}.")
+    return scheduled
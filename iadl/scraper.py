@@ -1,58 +1,214 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from iadl.extensions import ALL_EXTENSIONS
+import time
+from urllib.parse import urljoin, unquote
+from iadl.extensions import ExtensionIndex
+from iadl.files import ArchiveFile
+from iadl.progress import PrintProgress
+from iadl.throttle import backoff_delay
 
 class InternetArchiveScraper:
-    def __init__(self, url="https://archive.org", item_id="rr-sega-mega-cd"):
-        """Initialize the scraper with the URL and collection ID"""
+    def __init__(self, url="https://archive.org", item_id="rr-sega-mega-cd", cache=None, session=None,
+                 progress=None):
+        """
+        Initialize the scraper with the URL and collection ID.
+        If a ListingCache is given, item metadata is read from and stored in it.
+        A requests.Session can be passed to share connections between several scrapers.
+        Status messages go to `progress` (see iadl.progress); they are printed by default.
+        """
         self.url = url
         self.item_id = item_id
-        self.session = requests.Session()
+        self.cache = cache
+        self._session = session
+        self.progress = progress or PrintProgress()
     
-    def get_file_links(self, file_extensions=None, show_links=False):
+    @property
+    def session(self):
+        """The HTTP session, created on first use: listings served from the cache never load requests"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+    
+    def fetch_metadata_file_list(self):
         """
-        Scrape all file links from the collection.
+        Return the raw 'files' list of /metadata/<item_id>, going through the listing cache if enabled.
+        Fresh cache entries are used as-is; stale ones are revalidated with a conditional request.
+        """
+        metadata_url = f"{self.url}/metadata/{self.item_id}"
+        key = f"{self.url}/{self.item_id}"
+        entry = self.cache.get(key) if self.cache else None
+        
+        if entry and self.cache.is_fresh(entry):
+            self.progress.message(f"Using cached metadata for {self.item_id}.")
+            return entry['data']
+        
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        self.progress.message(f"Fetching metadata from {metadata_url}...")
+        response = self.session.get(metadata_url, headers=headers, timeout=30)
+        if response.status_code == 304 and entry:
+            self.progress.message("Cached metadata is still up to date.")
+            self.store_cached(self.cache.touch, key, entry)
+            return entry['data']
+        response.raise_for_status()
+        
+        files = response.json().get('files')
+        if files and self.cache:
+            self.store_cached(self.cache.put, key, files, etag=response.headers.get('etag'),
+                              last_modified=response.headers.get('last-modified'))
+        return files
+    
+    def store_cached(self, write, key, *args, **kwargs):
+        """
+        Write to the listing cache (cache.put or cache.touch) on a best-effort basis: an unwritable
+        cache is reported and ignored, so it is never mistaken for an unavailable metadata API.
+        """
+        try:
+            write(key, *args, **kwargs)
+        except OSError as e:
+            self.progress.message(f"Warning: could not update the listing cache ({str(e)}).")
+    
+    def get_metadata_files(self):
+        """
+        Fetch the item's file manifest from the metadata API (/metadata/<item_id>).
+        Returns a list of ArchiveFile records, or None if the API has no files for this item.
+        """
+        files = self.fetch_metadata_file_list()
+        if not files:
+            return None
+        self.progress.message(f"Found {len(files)} files in item metadata.")
+        return [ArchiveFile.from_metadata(self.url, self.item_id, entry) for entry in files if entry.get('name')]
+    
+    def scrape_details_files(self):
+        """
+        Scrape the download links rendered on the item's details page.
+        Only used as a fallback when the metadata API is unavailable; records carry no size or checksums.
+        """
+        self.progress.message(f"Visiting {self.url}/details/{self.item_id}...")
+        
+        # Visit the main page first
+        response = self.session.get(f"{self.url}/details/{self.item_id}", timeout=30)
+        response.raise_for_status()
+        self.progress.message("Main page fetched successfully.")
+        
+        # Parse the HTML content (BeautifulSoup is only loaded for this fallback)
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(response.text, 'html.parser')
+        self.progress.message("Parsed main page HTML.")
+        
+        # Find all download links
+        download_links = soup.select('a[href*="/download/"]')
+        self.progress.message(f"Found {len(download_links)} download links.")
+        
+        files = []
+        for link in download_links:
+            href = link.get('href', '')
+            full_url = urljoin(self.url, href)
+            name = unquote(href.split('/download/', 1)[1].split('/', 1)[-1])
+            files.append(ArchiveFile(item_id=self.item_id, name=name, url=full_url))
+        return files
+    
+    def iter_files(self, file_extensions=None):
+        """
+        Yield the item's files as ArchiveFile records, filtered by file_extensions (None for all files).
+        The metadata API is used first, falling back to scraping the details page.
+        """
+        index = ExtensionIndex(file_extensions)
+        try:
+            files = self.get_metadata_files()
+        except (OSError, ValueError) as e:  # requests.RequestException is an OSError
+            self.progress.message(f"Metadata API unavailable ({str(e)}), falling back to the details page.")
+            files = None
+        if files is None:
+            files = self.scrape_details_files()
+        
+        # Filter files by extensions (if provided)
+        for file in files:
+            if index.match(file.name):
+                yield file
+    
+    def get_files(self, file_extensions=None, show_links=False):
+        """
+        List the files of the item as ArchiveFile records (name, size, md5/sha1, mtime, format).
         If file_extensions is provided, only include files with matching extensions.
         If file_extensions is None, include all files.
         If show_links is True, display the file links in a prettier format.
         """
-        if file_extensions is None:
-            file_extensions = ALL_EXTENSIONS
-        
-        print(f"Visiting {self.url}/details/{self.item_id}...")
-        
         try:
-            # Visit the main page first
-            response = self.session.get(f"{self.url}/details/{self.item_id}")
-            response.raise_for_status()
-            print("Main page fetched successfully.")
-            
-            # Parse the HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            print("Parsed main page HTML.")
-            
-            # Find all download links
-            download_links = soup.select('a[href*="/download/"]')
-            print(f"Found {len(download_links)} download links.")
-            
-            # Filter links by file extensions (if provided)
-            file_links = []
-            for link in download_links:
-                href = link.get('href', '')
-                if any(href.endswith(ext) for ext in file_extensions):
-                    full_url = urljoin(self.url, href)
-                    file_links.append(full_url)
+            files = list(self.iter_files(file_extensions))
             
             # Display file links in a prettier format if show_links is True
-            if show_links and file_links:
-                print("\n=== File Links ===")
-                for i, file_url in enumerate(file_links, 1):
-                    print(f"{i:>3}. {file_url}")
-                print("==================\n")
+            if show_links and files:
+                self.progress.message("\n=== File Links ===")
+                for i, file in enumerate(files, 1):
+                    self.progress.message(f"{i:>3}. {file.url}")
+                self.progress.message("==================\n")
         
-            return file_links
+            return files
         
         except Exception as e:
-            print(f"Error scraping file links: {str(e)}")
-            return []
\ No newline at end of file
+            self.progress.message(f"Error scraping file links: {str(e)}")
+            return []
+    
+    def iter_collection_items(self, collection=None, page_size=1000):
+        """
+        Yield the identifiers of every item in a collection (this scraper's item_id by default),
+        page by page through the cursor-based scrape API, so memory does not grow with the collection.
+        """
+        collection = collection or self.item_id
+        params = {'q': f"collection:{collection}", 'fields': 'identifier', 'count': max(100, page_size)}
+        while True:
+            page = self.fetch_collection_page(params)
+            if page is None:
+                break
+            for item in page.get('items', []):
+                if item.get('identifier'):
+                    yield item['identifier']
+            cursor = page.get('cursor')
+            if not cursor:
+                break
+            params['cursor'] = cursor
+    
+    def fetch_collection_page(self, params, retries=3):
+        """
+        Fetch one page of the scrape API, retrying with backoff.
+        Returns the decoded page, or None once every attempt failed (the error is reported).
+        """
+        for attempt in range(retries):
+            try:
+                response = self.session.get(f"{self.url}/services/search/v1/scrape", params=params, timeout=60)
+                response.raise_for_status()
+                return response.json()
+            except (OSError, ValueError) as e:  # requests.RequestException is an OSError
+                if attempt == retries - 1:
+                    self.progress.message(f"Error listing collection page ({str(e)}), "
+                                          f"the rest of the collection is skipped.")
+                    return None
+                self.progress.message(f"Error listing collection page ({str(e)}), retrying...")
+                time.sleep(backoff_delay(attempt))
+    
+    def iter_collection_files(self, file_extensions=None, collection=None):
+        """
+        Yield the files of every item in a collection as soon as each item is listed,
+        so downloads can start while the rest of the collection is still being enumerated.
+        Items that fail to list are reported and skipped.
+        """
+        for item_id in self.iter_collection_items(collection):
+            scraper = InternetArchiveScraper(url=self.url, item_id=item_id, cache=self.cache, session=self.session,
+                                             progress=self.progress)
+            try:
+                yield from scraper.iter_files(file_extensions)
+            except Exception as e:
+                self.progress.message(f"Error listing item {item_id}: {str(e)}")
+    
+    def get_file_links(self, file_extensions=None, show_links=False):
+        """
+        Scrape all file links from the collection.
+        If file_extensions is provided, only include files with matching extensions.
+        If file_extensions is None, include all files.
+        If show_links is True, display the file links in a prettier format.
+        """
+        return [f.url for f in self.get_files(file_extensions=file_extensions, show_links=show_links)]
@@ -0,0 +1,144 @@
+import os
+import time
+import socket
+import hashlib
+import argparse
+import threading
+from urllib.parse import unquote
+from iadl.files import ArchiveFile
+
+def parse_shard(value):
+    """Parse a shard spec such as '3/8' (shard 3 of 8, counting from 1) into (3, 8)"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected K/N such as 3/8")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', K must be between 1 and N")
+    return index, count
+
+def shard_key(file):
+    """Name a file by its item and file name, the same on every host whatever its destination folder"""
+    if isinstance(file, ArchiveFile):
+        return f"{file.item_id}/{file.name}"
+    return unquote(file.rsplit('/', 1)[-1])
+
+def shard_of(file, count):
+    """Return the shard (1..count) a file belongs to, from a stable hash of its name"""
+    digest = hashlib.sha1(shard_key(file).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+def shard_files(files, index, count):
+    """
+    Keep the files of shard `index` out of `count`.
+    Every process given the same listing and count gets a disjoint part of it, and together
+    they cover all of it. Lists stay lists; other iterables are filtered lazily.
+    """
+    if hasattr(files, '__len__'):
+        return [file for file in files if shard_of(file, count) == index]
+    return (file for file in files if shard_of(file, count) == index)
+
+class WorkQueue:
+    # Folder of lock files in the destination folder
+    FOLDER_NAME = '.iadl-locks'
+
+    def __init__(self, folder, ttl=300):
+        """
+        Coordinate several processes (or hosts) downloading into one shared destination folder.
+        A file is claimed by creating its lock file exclusively (O_EXCL), so only one process
+        downloads it. Claims are refreshed while held; a lock not refreshed for `ttl` seconds
+        belongs to a process that died and is taken over.
+        """
+        self.path = os.path.join(os.path.abspath(folder), self.FOLDER_NAME)
+        os.makedirs(self.path, exist_ok=True)
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.heartbeat = None
+
+    def lock_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, f"{digest}.lock")
+
+    def create(self, path, key):
+        """Create a lock file; False if it already exists"""
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{self.owner} {time.time():.0f} {key}\n")
+        return True
+
+    def take_over(self, path):
+        """
+        Remove a stale lock. The lock is first renamed to a name of our own, which only one
+        process can do; if it turns out to have been refreshed meanwhile, it is put back.
+        """
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                return False
+            tombstone = f"{path}.{self.owner.replace(':', '-')}.stale"
+            os.rename(path, tombstone)
+        except OSError:
+            return False
+        if time.time() - os.path.getmtime(tombstone) < self.ttl:
+            try:
+                os.link(tombstone, path)
+            except OSError:
+                pass
+            os.remove(tombstone)
+            return False
+        os.remove(tombstone)
+        return True
+
+    def claim(self, key):
+        """Try to claim a file for this process. Returns False if another live process holds it."""
+        path = self.lock_path(key)
+        if not self.create(path, key):
+            if not (self.take_over(path) and self.create(path, key)):
+                return False
+        with self.lock:
+            self.held.add(path)
+            if self.heartbeat is None:
+                self.stopped.clear()  # Claims after close() start refreshing again
+                self.heartbeat = threading.Thread(target=self.refresh, daemon=True)
+                self.heartbeat.start()
+        return True
+
+    def release(self, key):
+        """Give up the claim on a file (done or failed; a finished file is skipped by its existence)"""
+        path = self.lock_path(key)
+        with self.lock:
+            self.held.discard(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def refresh(self):
+        """Touch the held locks well within the TTL so other processes do not take them over"""
+        while not self.stopped.wait(self.ttl / 3):
+            with self.lock:
+                held = list(self.held)
+            for path in held:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stop refreshing and drop any claims still held"""
+        self.stopped.set()
+        with self.lock:
+            heartbeat, self.heartbeat = self.heartbeat, None
+            held, self.held = list(self.held), set()
+        if heartbeat is not None:
+            heartbeat.join()
+        for path in held:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
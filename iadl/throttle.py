@@ -0,0 +1,131 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+def backoff_delay(attempt, base=2.0, cap=60.0):
+    """Exponential backoff with full jitter: a random delay between 0 and min(cap, base * 2^attempt) seconds"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or an HTTP date) to seconds, or None if missing/invalid"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """
+        Thread-safe token bucket limiting throughput to `rate` bytes per second.
+        Up to `burst` bytes (default: one second worth) can be used at once after an idle period.
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, amount):
+        """
+        Take `amount` bytes from the bucket and return how many seconds the caller must wait
+        before using them. The bucket may go into debt, so large chunks are never refused.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+    
+    def consume(self, amount):
+        """Block until `amount` bytes may be transferred"""
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+class AdaptiveConcurrency:
+    # Seconds of transfers aggregated before the limit is reconsidered
+    WINDOW = 5.0
+
+    def __init__(self, maximum, minimum=1, initial=None):
+        """
+        Concurrency limit that adapts to observed conditions (additive increase, multiplicative decrease).
+        Every window the aggregate throughput is compared with the previous one: the limit grows by one
+        while throughput keeps improving and shrinks by one when it drops. A 429/503 response halves the
+        limit and pauses new transfers for the server's Retry-After delay.
+        """
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = initial or max(self.minimum, self.maximum // 4)
+        self.active = 0
+        self.paused_until = 0.0
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.last_throughput = None
+        self.condition = threading.Condition()
+    
+    def try_acquire(self):
+        """Take a transfer slot if one is free and no pause is in effect. Returns True on success."""
+        with self.condition:
+            if self.active < self.limit and time.monotonic() >= self.paused_until:
+                self.active += 1
+                return True
+            return False
+    
+    def acquire(self):
+        """Block until a transfer slot is free"""
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.active < self.limit:
+                    self.active += 1
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else 1.0)
+    
+    def release(self):
+        """Give back a transfer slot"""
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+    
+    def record_bytes(self, amount):
+        """Account transferred bytes and adjust the limit at the end of each window"""
+        with self.condition:
+            self.window_bytes += amount
+            now = time.monotonic()
+            elapsed = now - self.window_start
+            if elapsed < self.WINDOW:
+                return
+            throughput = self.window_bytes / elapsed
+            if self.last_throughput is None or throughput > self.last_throughput * 1.05:
+                self.limit = min(self.maximum, self.limit + 1)
+            elif throughput < self.last_throughput * 0.8:
+                self.limit = max(self.minimum, self.limit - 1)
+            self.last_throughput = throughput
+            self.window_start = now
+            self.window_bytes = 0
+            self.condition.notify_all()
+    
+    def record_throttle(self, retry_after=None):
+        """React to a 429/503 response: halve the limit and honour Retry-After"""
+        with self.condition:
+            self.limit = max(self.minimum, self.limit // 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            # Start a fresh window so the throttled period does not count as a throughput drop
+            self.window_start = time.monotonic()
+            self.window_bytes = 0
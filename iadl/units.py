@@ -0,0 +1,25 @@
+def human_readable_size(size_in_bytes):
+    """
+    Convert a file size in bytes to a human-readable format (e.g., B, KB, MB, GB, TB, PB, EB).
+    """
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB', 'PB', 'EB']:
+        if size_in_bytes < 1024:
+            return f"{size_in_bytes:.2f} {unit}"
+        size_in_bytes /= 1024
+    return f"{size_in_bytes:.2f} EB"  # Exabytes (just in case!)
+
+def parse_size(value):
+    """
+    Convert a human-readable size (e.g., '512K', '100M', '2G', '1.5GB') to bytes.
+    Plain numbers are taken as bytes.
+    """
+    text = str(value).strip().upper().rstrip('IB').rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    multiplier = 1
+    if text and text[-1] in units:
+        multiplier = units[text[-1]]
+        text = text[:-1]
+    size = int(float(text) * multiplier)
+    if size < 0:
+        raise ValueError(f"invalid size: {value}")
+    return size
@@ -0,0 +1,77 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from iadl.files import target_path
+from iadl.progress import PrintProgress
+
+# Read size used when hashing files already on disk
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def expected_checksum(file):
+    """
+    Return the (algorithm, hex digest) published for an ArchiveFile record, or None.
+    MD5 is preferred because it is the cheapest to compute; SHA-1 is used when MD5 is missing.
+    """
+    for algorithm in ('md5', 'sha1'):
+        value = getattr(file, algorithm, None)
+        if value:
+            return algorithm, value.lower()
+    return None
+
+def hash_file(path, algorithm, length=None, hasher=None):
+    """
+    Hash the first `length` bytes of a file (the whole file if length is None).
+    An existing hashlib object can be passed to continue from it. Returns the hashlib object.
+    """
+    hasher = hasher or hashlib.new(algorithm)
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(HASH_BLOCK_SIZE if remaining is None else min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher
+
+def verify_file(path, algorithm, expected):
+    """Check a file on disk against its expected checksum. Returns (path, status) with status 'ok', 'mismatch' or 'missing'."""
+    if not os.path.exists(path):
+        return path, 'missing'
+    digest = hash_file(path, algorithm).hexdigest()
+    return path, 'ok' if digest == expected else 'mismatch'
+
+def verify_folder(folder, files, workers=None, item_subfolders=False, recorded=None, progress=None):
+    """
+    Verify the files of an item listing that were downloaded to `folder`, in parallel across processes.
+    Files are looked up where FileDownloader saves them (under '<folder>/<item_id>/' with item_subfolders).
+    Files without a published checksum are skipped. If `recorded` is a set of paths relative to
+    `folder` (from the sync manifest or job journal), missing files outside it were never selected
+    for download and are skipped too. Returns {relative path: status}.
+    Messages go to `progress` (printed by default).
+    """
+    progress = progress or PrintProgress()
+    jobs = {}
+    for file in files:
+        checksum = expected_checksum(file)
+        if checksum is None:
+            continue
+        path = target_path(folder, file, item_subfolders)[2]
+        key = os.path.relpath(path, folder).replace(os.sep, '/')
+        if recorded is not None and key not in recorded and not os.path.exists(path):
+            continue
+        jobs[path] = (key, checksum)
+
+    results = {}
+    progress.message(f"Verifying {len(jobs)} files in {folder}...")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(verify_file, path, algorithm, expected)
+                   for path, (_, (algorithm, expected)) in jobs.items()]
+        for future in futures:
+            path, status = future.result()
+            file_name = jobs[path][0]
+            results[file_name] = status
+            if status != 'ok':
+                progress.message(f"{status.upper()}: {file_name}")
+    return results